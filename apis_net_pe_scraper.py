@@ -164,10 +164,12 @@ class ApisNetPeScraper:
             cursor = conn.cursor()
             
             query = "SELECT ruc FROM ruc_lookup WHERE razon_social IS NULL"
+            params = None
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT %s"
+                params = (limit,)
                 
-            cursor.execute(query)
+            cursor.execute(query, params)
             rucs = [row[0] for row in cursor.fetchall()]
             
             cursor.close()
@@ -98,10 +98,12 @@ class OptimizedPeruScraper:
                 ORDER BY ruc, first_id
             """
             
+            params = None
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT %s"
+                params = (limit,)
                 
-            cursor.execute(query)
+            cursor.execute(query, params)
             results = cursor.fetchall()
             rucs = [row[0] for row in results]
             cursor.close()
@@ -86,10 +86,12 @@ class PeruConsultScraper:
                          id
             """
             
+            params = None
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT %s"
+                params = (limit,)
                 
-            cursor.execute(query)
+            cursor.execute(query, params)
             rucs = [row[0] for row in cursor.fetchall()]
             cursor.close()
             
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Reusable browser session for the test scripts.
+With REUSE_BROWSER=true the first run starts a detached chromedriver + Chrome
+and saves the session; later runs re-attach to it instead of launching Chrome.
+"""
+
+import os
+import json
+import time
+import subprocess
+import requests
+import undetected_chromedriver as uc
+from selenium import webdriver
+from selenium.webdriver.common.utils import free_port
+
+REUSE_BROWSER = os.getenv('REUSE_BROWSER', 'false').lower() == 'true'
+
+# Saved {command_executor, session_id} of the running browser
+SESSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'browser_session.json')
+
+class ReusableChrome(webdriver.Remote):
+    """Remote driver that attaches to an existing session instead of creating one"""
+
+    def __init__(self, command_executor, session_id):
+        self._saved_session_id = session_id
+        super().__init__(command_executor=command_executor, options=webdriver.ChromeOptions())
+
+    def start_session(self, capabilities, *args, **kwargs):
+        """Adopt the saved session instead of POSTing a new /session"""
+        self.session_id = self._saved_session_id
+        self.caps = {}
+
+    @classmethod
+    def load(cls):
+        """Attach to the saved session; raises if it is gone"""
+        with open(SESSION_FILE) as f:
+            state = json.load(f)
+
+        driver = cls(state['command_executor'], state['session_id'])
+        driver.title  # probe: fails fast if the browser was closed
+        return driver
+
+    @staticmethod
+    def launch(options):
+        """Start a detached chromedriver, open a session on it and save it for reuse"""
+        command_executor = _start_chromedriver()
+        driver = webdriver.Remote(command_executor=command_executor, options=options)
+
+        os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
+        with open(SESSION_FILE, 'w') as f:
+            json.dump({'command_executor': command_executor, 'session_id': driver.session_id}, f)
+
+        return driver
+
+def _chromedriver_executable():
+    """Pinned chromedriver (CHROMEDRIVER_PATH) or the one patched by undetected_chromedriver"""
+    path = os.getenv('CHROMEDRIVER_PATH')
+    if path and os.path.exists(path):
+        return path
+
+    patcher = uc.Patcher(version_main=int(os.getenv('CHROME_MAJOR') or 0))
+    patcher.auto()
+    return patcher.executable_path
+
+def _start_chromedriver():
+    """Run chromedriver in its own session so it outlives this process"""
+    port = free_port()
+    subprocess.Popen(
+        [_chromedriver_executable(), f'--port={port}'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+    command_executor = f'http://127.0.0.1:{port}'
+    for _ in range(50):
+        try:
+            if requests.get(f'{command_executor}/status', timeout=1).ok:
+                return command_executor
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+
+    raise RuntimeError("chromedriver did not start")
+
+def open_browser(options):
+    """uc.Chrome, or with REUSE_BROWSER=true the saved browser session (launched once)"""
+    if not REUSE_BROWSER:
+        return uc.Chrome(options=options, version_main=None)
+
+    try:
+        return ReusableChrome.load()
+    except Exception:
+        return ReusableChrome.launch(options)
+
+def close_browser(driver):
+    """Quit the browser, unless it is being kept for the next run"""
+    if not REUSE_BROWSER:
+        driver.quit()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+REST API resolvers tried before scraping SUNAT directly.
+Each resolver returns the razón social for a RUC or None on a miss, and
+raises requests/JSON errors so the caller can move on to the next tier.
+"""
+
+import os
+
+class ApisNetPeResolver:
+    """apis.net.pe RUC endpoint (token required)"""
+
+    name = 'apis.net.pe'
+    url = "https://api.apis.net.pe/v1/ruc"
+
+    def __init__(self, token, session):
+        self.token = token
+        self.session = session
+
+    def get(self, ruc):
+        response = self.session.get(
+            self.url,
+            params={'numero': ruc},
+            headers={'Authorization': f'Bearer {self.token}'},
+            timeout=10
+        )
+        if response.status_code != 200:
+            return None
+
+        company_name = (response.json().get('nombre') or '').strip()
+        return company_name or None
+
+class ConsultaPeruResolver:
+    """Self-hosted Peru Consult API"""
+
+    name = 'peru-consult'
+
+    def __init__(self, api_url, token, session):
+        self.api_url = api_url.rstrip('/')
+        self.token = token
+        self.session = session
+
+    def get(self, ruc):
+        response = self.session.get(
+            f"{self.api_url}/api/v1/ruc/{ruc}",
+            params={'token': self.token},
+            timeout=10
+        )
+        if response.status_code != 200:
+            return None
+
+        company_name = (response.json().get('razonSocial') or '').strip()
+        return company_name if len(company_name) > 3 else None
+
+def build_resolvers(session):
+    """Resolvers configured in the environment, in the order they should be tried"""
+    resolvers = []
+
+    token = os.getenv('APIS_NET_PE_TOKEN')
+    if token:
+        resolvers.append(ApisNetPeResolver(token, session))
+
+    token = os.getenv('PERU_CONSULT_API_TOKEN')
+    if token:
+        api_url = os.getenv('PERU_CONSULT_API_URL', 'http://localhost:8080')
+        resolvers.append(ConsultaPeruResolver(api_url, token, session))
+
+    return resolvers
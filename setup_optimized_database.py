@@ -47,6 +47,29 @@ def setup_optimized_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_ruc_cache_ruc ON ruc_cache(ruc);')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_ruc_cache_scraped ON ruc_cache(scraped_at);')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sunat_empresas_ruc ON sunat_empresas(ruc);')
+        # Pending RUCs, one partial index per priority (matches sunat_scraper.get_rucs_to_scrape)
+        cursor.execute('DROP INDEX IF EXISTS idx_sunat_empresas_pending_priority;')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_active_pending ON sunat_empresas(id)
+            WHERE razon_social IS NULL AND estado = 'ACTIVO';
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_inactive_pending ON sunat_empresas(id)
+            WHERE razon_social IS NULL AND estado IS DISTINCT FROM 'ACTIVO';
+        ''')
+        
+        # Malformed RUCs are tracked here (sunat_scraper.mark_invalid_rucs), not as razon_social = ''.
+        # TEXT: the rows include values that are not 11 characters long
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS invalid_rucs (
+                ruc TEXT PRIMARY KEY,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        ''')
+        # Undo the old empty-string marker; the scraper re-detects those RUCs by check digit
+        cursor.execute("UPDATE sunat_empresas SET razon_social = NULL WHERE razon_social = ''")
+        if cursor.rowcount:
+            print(f"🧹 Cleared {cursor.rowcount:,} empty razon_social markers")
         
         # 3. Get statistics
         print("📊 Analyzing current data...")
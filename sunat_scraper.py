@@ -6,155 +6,833 @@ and updates the PostgreSQL database with company names (razon_social)
 """
 
 import os
+import re
 import sys
 import time
+import queue
+import atexit
+import asyncio
 import random
+import shutil
 import logging
-import psycopg2
+import functools
+import subprocess
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+import psycopg
+from psycopg_pool import ConnectionPool, PoolTimeout
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, SessionNotCreatedException
 from webdriver_manager.chrome import ChromeDriverManager
 import undetected_chromedriver as uc
 from fake_useragent import UserAgent
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+import aiohttp
 from twocaptcha import TwoCaptcha
+from ruc_resolvers import build_resolvers
+import lxml.html
+from lxml import etree
+from selectolax.lexbor import LexborHTMLParser
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Configure logging: QueueHandler still builds each message (%-args, traceback) on
+# the calling thread; the listener thread only adds the timestamp/level prefix and
+# does the file/stdout writes, so the blocking I/O is what leaves the scraping path
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+log_handlers = [
+    logging.FileHandler('sunat_scraper.log', delay=True),
+    logging.StreamHandler(sys.stdout)
+]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sunat_scraper.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+# reCAPTCHA v3 tokens stay valid for ~2 minutes; reuse them within this window
+CAPTCHA_TOKEN_TTL = 90
+
+# Single-pass, case-insensitive scans for error pages and non-name table cells
+ERROR_PAGE_RE = re.compile(r"no se encontró|no existe|error|no encontrado", re.IGNORECASE)
+CONTENT_SKIP_RE = re.compile(
+    r"ruc|documento|número|codigo|fecha|estado|dirección|distrito|provincia|"
+    r"departamento|teléfono|email|www|http",
+    re.IGNORECASE
+)
+# Identifier-like text that is not a company name; \bruc\b so "CONSTRUCTORA" still passes
+NAME_SKIP_RE = re.compile(r"\bruc\b|documento|número|codigo", re.IGNORECASE)
+LABEL_PREFIX_RE = re.compile(r"raz[oó]n", re.IGNORECASE)
+
+# Realistic Windows Chrome agent shared by the browser and the plain HTTP client
+CHROME_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Hides the usual automation fingerprints; run once per new driver
+STEALTH_JS = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+    Object.defineProperty(navigator, 'languages', {get: () => ['es-PE', 'es', 'en-US', 'en']});
+    window.chrome = {runtime: {}};
+    
+    // Override permissions
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+"""
+
+# Search form fallback submit button
+SUBMIT_SELECTOR = "input[type='submit'], button[type='submit']"
+
+# Evaluated in the page to read the razón social without transferring the DOM.
+# Handles the label/value table layout and the "Número de RUC: <ruc> - <name>" headings.
+RAZON_SOCIAL_JS = """
+(() => {
+    const text = (el) => el.textContent.replace(/\\s+/g, ' ').trim();
+    for (const td of document.getElementsByTagName('td')) {
+        const label = text(td);
+        if (label.length < 60 && /raz[oó]n social/i.test(label)) {
+            const value = td.nextElementSibling && text(td.nextElementSibling);
+            if (value) return value;
+        }
+    }
+    const headings = document.querySelectorAll('h4.list-group-item-heading');
+    for (let i = 0; i < headings.length - 1; i++) {
+        if (/n[uú]mero de ruc/i.test(text(headings[i]))) {
+            const value = text(headings[i + 1]);
+            const sep = value.indexOf(' - ');
+            return sep >= 0 ? value.slice(sep + 3).trim() : value;
+        }
+    }
+    return null;
+})()
+"""
+
+# Patched chromedriver binaries are kept here so uc skips the download/patch step
+CHROMEDRIVER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'sunatscraper')
+
+@functools.lru_cache(maxsize=None)
+def _detect_chrome_major():
+    """Major version of the installed Chrome (`chrome --version`), or None if it can't be read"""
+    binary = uc.find_chrome_executable()
+    if not binary:
+        return None
+    try:
+        output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("⚠️ Could not read the Chrome version: %s", e)
+        return None
+    match = re.search(r"(\d+)\.\d+", output)
+    return int(match.group(1)) if match else None
+
+def _chrome_major_version():
+    """Installed Chrome major version from CHROME_MAJOR, else detected (None lets uc pick)"""
+    version = os.getenv('CHROME_MAJOR')
+    return int(version) if version else _detect_chrome_major()
+
+def _cached_chromedriver_path(version_main):
+    """Cache location of the patched chromedriver for a Chrome major version"""
+    return os.path.join(CHROMEDRIVER_CACHE_DIR, f"chromedriver-{version_main or 'auto'}")
+
+def _chromedriver_path(version_main):
+    """Pinned chromedriver: CHROMEDRIVER_PATH if set, else a previously cached binary"""
+    path = os.getenv('CHROMEDRIVER_PATH')
+    if path and os.path.exists(path):
+        return path
+    
+    cached = _cached_chromedriver_path(version_main)
+    return cached if os.path.exists(cached) else None
+
+# SUNAT consulta RUC endpoints used by the plain HTTP path
+SUNAT_HOME_URL = "https://e-consultaruc.sunat.gob.pe/"
+SUNAT_BASE_URL = "https://e-consultaruc.sunat.gob.pe/cl-ti-itmrconsruc"
+SUNAT_SEARCH_URL = f"{SUNAT_BASE_URL}/FrameCriterioBusquedaWeb.jsp"
+SUNAT_RESULT_URL = f"{SUNAT_BASE_URL}/jcrS00Alias"
+SUNAT_RANDOM_URL = f"{SUNAT_BASE_URL}/captcha?accion=random"
+
+# Result page layout: <h4>Número de RUC:</h4> ... <h4><ruc> - <razón social></h4>
+RUC_HEADING_SELECTOR = 'h4'
+RUC_HEADING_LABEL = 'Número de RUC'
+CAPTCHA_PAGE_RE = re.compile(r"data-sitekey|g-recaptcha|imgCaptcha|txtCodigo", re.IGNORECASE)
+# SUNAT's explicit "no match" answers; any other page without a name is not trusted as a miss
+NOT_FOUND_PAGE_RE = re.compile(r"no se encontr[oó]|no existe|no encontrado", re.IGNORECASE)
+
+HTTP_HEADERS = {
+    'User-Agent': CHROME_USER_AGENT,
+    'Referer': SUNAT_SEARCH_URL
+}
+
+def _results_loaded(driver):
+    """WebDriverWait condition: the search form was replaced by results or an error page"""
+    url = driver.current_url
+    return (
+        "FrameCriterioBusquedaWeb.jsp" not in url or
+        "error" in url.lower() or
+        not driver.find_elements(By.ID, "txtRuc")
+    )
+
+def _consulta_form(ruc, num_rnd):
+    """Form fields SUNAT's search page posts for a lookup by RUC"""
+    return {
+        'accion': 'consPorRuc',
+        'nroRuc': ruc,
+        'contexto': 'ti-it',
+        'modo': '1',
+        'rbtnTipo': '1',
+        'search1': ruc,
+        'tipdoc': '1',
+        'numRnd': num_rnd
+    }
+
+# Precompiled lookups for parsing a full result page with lxml
+_LOWER = "translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZÁÉÍÓÚ', 'abcdefghijklmnopqrstuvwxyzáéíóú')"
+RAZON_SOCIAL_XPATH = etree.XPath(
+    f"//td[contains({_LOWER}, 'razón social') or contains({_LOWER}, 'razon social')]"
+    "/following-sibling::td[1]"
+)
+TABLE_ROW_XPATH = etree.XPath("//tr[count(td) >= 2]")
+TABLE_LABEL_RE = re.compile(r"raz[oó]n social|nombre|denominación|company name|business name", re.IGNORECASE)
+LABEL_TEXT_RE = re.compile(r"raz[oó]n social|nombre|denominación", re.IGNORECASE)
+NAME_PATTERN_XPATHS = tuple(etree.XPath(xpath) for xpath in (
+    "//*[contains(@class, 'razon')]",
+    "//*[contains(@class, 'nombre')]",
+    "//*[contains(@class, 'company')]",
+    "//*[contains(@class, 'business')]",
+    "//*[contains(@id, 'razon')]",
+    "//*[contains(@id, 'nombre')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' content ')]//td[count(preceding-sibling::*) = 1]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' result ')]//td[count(preceding-sibling::*) = 1]",
+    "//table[contains(concat(' ', normalize-space(@class), ' '), ' data ')]//td[count(preceding-sibling::*) = 1]"
+))
+
+def _node_text(element):
+    """Whitespace-normalized text of an lxml element"""
+    return ' '.join(element.text_content().split())
+
+def _parse_company_name(html):
+    """Extract the razón social from a SUNAT result page (selectolax: no lxml tree per response)"""
+    headings = LexborHTMLParser(html).css(RUC_HEADING_SELECTOR)
+    for heading, next_heading in zip(headings, headings[1:]):
+        if RUC_HEADING_LABEL in heading.text():
+            value = next_heading.text(deep=False, strip=True)
+            break
+    else:
+        return None
+    
+    _, sep, name = value.partition(' - ')
+    return (name if sep else value).strip() or None
+
+def _classify_result_page(html, ruc):
+    """Company name from a SUNAT answer, None on its explicit no-match page;
+    raises CaptchaChallenge or UnexpectedPage for anything else"""
+    company_name = _parse_company_name(html)
+    if company_name:
+        return company_name
+    if CAPTCHA_PAGE_RE.search(html):
+        raise CaptchaChallenge(f"CAPTCHA requested for RUC {ruc}")
+    if not NOT_FOUND_PAGE_RE.search(html):
+        raise UnexpectedPage(f"Unrecognized SUNAT response for RUC {ruc}")
+    return None
+
+# Scraped names are written in one UPDATE per this many rows (10 000 at most)
+UPDATE_BATCH_SIZE = 1000
+
+# Retry backoff cap in seconds
+MAX_BACKOFF = 60
+
+# Base cooldown in seconds after SUNAT answers with a CAPTCHA
+CAPTCHA_COOLDOWN = 15
+
+def _backoff_delay(attempt, error=None):
+    """Backoff keyed to the failure: Retry-After, CAPTCHA cooldown, else full-jitter exponential"""
+    if isinstance(error, RateLimited) and error.retry_after:
+        return error.retry_after
+    if isinstance(error, CaptchaChallenge):
+        return min(MAX_BACKOFF, CAPTCHA_COOLDOWN * 2 ** attempt) + random.uniform(0, 1)
+    # Slow page loads retry on the shorter schedule
+    base = 1 if isinstance(error, (TimeoutException, asyncio.TimeoutError)) else 2
+    return random.uniform(0, min(MAX_BACKOFF, base * 2 ** attempt))
+
+class TokenBucket:
+    """Thread-safe token bucket: callers only wait once they exceed `rate` requests per `per` seconds"""
+    
+    def __init__(self, rate, per=1.0):
+        self.rate = rate
+        self.per = per
+        # At least one token, so a sub-1/s rate still lets an idle caller through at once
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _reserve(self):
+        """Take a token and return how long to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.per)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens * self.per / self.rate)
+    
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+    
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+# SUNAT mod-11 check-digit weights for the first ten RUC digits
+RUC_WEIGHTS = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+def _valid_ruc(ruc):
+    """Check RUC format and its mod-11 check digit without hitting SUNAT"""
+    if len(ruc) != 11 or not ruc.isdigit():
+        return False
+    total = sum(int(digit) * weight for digit, weight in zip(ruc, RUC_WEIGHTS))
+    return (11 - total % 11) % 10 == int(ruc[10])
+
+class CaptchaChallenge(Exception):
+    """SUNAT answered with a CAPTCHA page instead of results"""
+
+class UnexpectedPage(Exception):
+    """SUNAT answered with neither results, a not-found message nor a CAPTCHA (e.g. an error page)"""
+
+class HttpSUNATScraper:
+    """Looks up RUCs with plain HTTP requests against the SUNAT form endpoint"""
+    
+    def __init__(self, session=None, rate_limiter=None):
+        # The session may be shared with the REST resolvers, so the SUNAT headers
+        # (spoofed Chrome agent, SUNAT Referer) go on each request, not on the session
+        self.session = session or requests.Session()
+        self.session_primed = False
+        self.rate_limiter = rate_limiter
+        # Consecutive CAPTCHA answers; each one lengthens the cooldown
+        self.captcha_streak = 0
+    
+    def prime_session(self):
+        """Load the search page once to obtain the JSESSIONID cookie"""
+        response = self.session.get(SUNAT_SEARCH_URL, headers=HTTP_HEADERS, timeout=15)
+        response.raise_for_status()
+        self.session_primed = True
+    
+    def lookup(self, ruc):
+        """Return the razón social for a RUC, or None on SUNAT's explicit no-match answer"""
+        if not self.session_primed:
+            self.prime_session()
+        
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        
+        num_rnd = self.session.get(SUNAT_RANDOM_URL, headers=HTTP_HEADERS, timeout=15).text.strip()
+        response = self.session.post(SUNAT_RESULT_URL, data=_consulta_form(ruc, num_rnd),
+                                     headers=HTTP_HEADERS, timeout=15)
+        response.raise_for_status()
+        
+        try:
+            company_name = _classify_result_page(response.text, ruc)
+        except CaptchaChallenge:
+            # Start over with a fresh session next time
+            self.session_primed = False
+            self.captcha_streak += 1
+            raise
+        except UnexpectedPage:
+            self.session_primed = False
+            self.captcha_streak = 0
+            raise
+        
+        self.captcha_streak = 0
+        return company_name
+
+class RateLimited(Exception):
+    """SUNAT asked us to slow down (HTTP 429/503)"""
+    
+    def __init__(self, retry_after=None):
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+def _retry_after_seconds(headers):
+    """Retry-After header in seconds, or None when absent or not numeric"""
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+class AsyncHttpSUNATScraper:
+    """Concurrent HTTP lookups: N worker tasks draining a queue over one pooled connector"""
+    
+    def __init__(self, concurrency=16, max_attempts=3, rate_limiter=None):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.rate_limiter = rate_limiter
+    
+    async def run(self, rucs):
+        """Look up RUCs concurrently; returns ({ruc: name or None}, [rucs needing the browser])"""
+        queue = asyncio.Queue()
+        for ruc in rucs:
+            queue.put_nowait(ruc)
+        
+        found = {}
+        misses = []
+        # A CAPTCHA pauses every worker (they share one IP) until resume_at (loop time)
+        self.resume_at = 0.0
+        self.captcha_streak = 0
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.concurrency,
+            ttl_dns_cache=300
+        )
+        try:
+            workers = min(self.concurrency, len(rucs))
+            await asyncio.gather(*[self._worker(connector, queue, found, misses) for _ in range(workers)])
+        finally:
+            await connector.close()
+        
+        return found, misses
+    
+    async def _worker(self, connector, queue, found, misses):
+        """Drain the queue with a session of our own (JSESSIONID) on the shared connection pool"""
+        async with aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=False,
+            headers=HTTP_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=15)
+        ) as session:
+            session_primed = False
+            
+            while True:
+                try:
+                    ruc = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                
+                pause = self.resume_at - asyncio.get_running_loop().time()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                
+                try:
+                    if not session_primed:
+                        await self._fetch(session, 'GET', SUNAT_SEARCH_URL)
+                        session_primed = True
+                    
+                    found[ruc] = await self._lookup_with_retry(session, ruc)
+                    self.captcha_streak = 0
+                    
+                except CaptchaChallenge as e:
+                    delay = _backoff_delay(self.captcha_streak, e)
+                    self.captcha_streak += 1
+                    self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + delay)
+                    logger.info("🔐 CAPTCHA challenge for RUC %s, queued for browser; pausing HTTP lookups %.1fs",
+                                ruc, delay)
+                    session.cookie_jar.clear()
+                    session_primed = False
+                    misses.append(ruc)
+                except UnexpectedPage as e:
+                    logger.warning("⚠️ %s, queued for browser", e)
+                    session.cookie_jar.clear()
+                    session_primed = False
+                    misses.append(ruc)
+                except (aiohttp.ClientError, asyncio.TimeoutError, RateLimited) as e:
+                    logger.warning("⚠️ HTTP lookup failed for RUC %s, queued for browser: %s", ruc, e)
+                    misses.append(ruc)
+    
+    async def _lookup_with_retry(self, session, ruc):
+        """Look up a RUC, backing off on rate limits and transient network errors"""
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._lookup(session, ruc)
+            except (RateLimited, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, e))
+    
+    async def _lookup(self, session, ruc):
+        """Return the razón social for a RUC, or None on SUNAT's explicit no-match answer"""
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async()
+        
+        num_rnd = (await self._fetch(session, 'GET', SUNAT_RANDOM_URL)).strip()
+        html = await self._fetch(session, 'POST', SUNAT_RESULT_URL, data=_consulta_form(ruc, num_rnd))
+        
+        return _classify_result_page(html, ruc)
+    
+    async def _fetch(self, session, method, url, **kwargs):
+        """Send a request and return the body, raising RateLimited on 429/503"""
+        async with session.request(method, url, **kwargs) as response:
+            if response.status in (429, 503):
+                raise RateLimited(_retry_after_seconds(response.headers))
+            response.raise_for_status()
+            return await response.text()
+
+class ChromeDriverPool:
+    """Fixed set of pre-warmed Chrome drivers leased to worker threads"""
+    
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.drivers = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self.drivers.put(self._new_driver())
+    
+    def _new_driver(self):
+        """Create a driver, or None (retried on next lease) if Chrome fails to start"""
+        try:
+            return self.factory()
+        except Exception as e:
+            logger.error("❌ Pooled driver setup failed: %s", e)
+            return None
+    
+    @contextmanager
+    def lease(self):
+        """Borrow a driver; it is cleaned (or replaced if it died) when returned"""
+        driver = self.drivers.get()
+        if driver is None:
+            driver = self._new_driver()
+        try:
+            yield driver
+        finally:
+            self.drivers.put(self._recycle(driver))
+    
+    def _recycle(self, driver):
+        """Reset a returned driver, replacing it when it no longer responds"""
+        if driver is None:
+            return None
+        try:
+            driver.delete_all_cookies()
+            return driver
+        except Exception as e:
+            logger.warning("⚠️ Pooled driver unresponsive, replacing: %s", e)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return self._new_driver()
+    
+    def close(self):
+        """Quit every pooled driver"""
+        while not self.drivers.empty():
+            driver = self.drivers.get_nowait()
+            if driver:
+                driver.quit()
+
+class AttemptedRucCache:
+    """RUCs attempted recently, kept in a Redis sorted set scored by attempt time"""
+    
+    KEY = 'sunat:attempted'
+    TTL = 86400
+    
+    def __init__(self, url):
+        self.redis = redis.Redis.from_url(url)
+    
+    def filter_new(self, rucs):
+        """Drop RUCs attempted within the TTL"""
+        if not rucs:
+            return rucs
+        self.redis.zremrangebyscore(self.KEY, '-inf', time.time() - self.TTL)
+        scores = self.redis.zmscore(self.KEY, rucs)
+        return [ruc for ruc, score in zip(rucs, scores) if score is None]
+    
+    def add(self, rucs):
+        """Record an attempt (a saved name or a definite miss) for each RUC"""
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.KEY, {ruc: now for ruc in rucs})
+        pipe.expire(self.KEY, self.TTL)
+        pipe.execute()
+
 class SUNATScraper:
     def __init__(self):
         self.db_config = {
             'host': os.getenv('DB_HOST'),
             'port': os.getenv('DB_PORT', '5432'),
-            'database': os.getenv('DB_NAME'),
+            'dbname': os.getenv('DB_NAME'),
             'user': os.getenv('DB_USER'),
             'password': os.getenv('DB_PASSWORD')
         }
         
-        self.delay_min = int(os.getenv('DELAY_MIN', '2'))
-        self.delay_max = int(os.getenv('DELAY_MAX', '5'))
         self.batch_size = int(os.getenv('BATCH_SIZE', '100'))
         self.max_retries = int(os.getenv('MAX_RETRIES', '3'))
         self.headless = os.getenv('HEADLESS', 'true').lower() == 'true'
+        self.processes = int(os.getenv('SCRAPER_PROCESSES', '1')) or os.cpu_count()
+        self.browser_workers = int(os.getenv('BROWSER_WORKERS', '1'))
+        self.use_http = os.getenv('HTTP_LOOKUP', 'true').lower() == 'true'
+        self.http_concurrency = int(os.getenv('HTTP_CONCURRENCY', '16'))
+        
+        # Cap on SUNAT lookups per second (per process). The default is about the old
+        # 2-5 s delay per lookup; 0 is an explicit opt-out that disables the limiter
+        rate_limit = float(os.getenv('SUNAT_RATE_LIMIT', '0.4'))
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit > 0 else None
         
         # CAPTCHA service setup
         self.captcha_api_key = os.getenv('2CAPTCHA_API_KEY')
         self.solver = TwoCaptcha(self.captcha_api_key) if self.captcha_api_key else None
         
+        # Solved tokens keyed by site_key -> (timestamp, code), and solves still in flight
+        # (site_key -> Future of the 2captcha id, set once the submission returns)
+        self.captcha_cache = {}
+        self.captcha_pending = {}
+        self.captcha_lock = threading.Lock()
+        
+        # One keep-alive session reused for every HTTP call this scraper makes
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+        
+        # Plain HTTP lookups; the browser is only started for CAPTCHA challenges
+        self.http_scraper = HttpSUNATScraper(session=self.http, rate_limiter=self.rate_limiter) if self.use_http else None
+        
+        # Token-based REST APIs tried before SUNAT itself (empty unless configured)
+        self.api_resolvers = build_resolvers(self.http)
+        
         self.driver = None
-        self.db_connection = None
+        self.db_pool = None
+        
+        # (ruc, razon_social) rows waiting for the next batched UPDATE
+        self.pending = []
+        # Rows committed so far; successes are counted from this, not from queued rows
+        self.rows_written = 0
+        
+        # Optional Redis-backed record of recent attempts, so restarts skip them
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url and not redis:
+            logger.warning("⚠️ REDIS_URL is set but the redis package is not installed")
+        self.attempted = AttemptedRucCache(redis_url) if redis_url and redis else None
         
     def setup_database(self):
-        """Setup database connection"""
+        """Open the database connection pool (one per process)"""
         try:
-            self.db_connection = psycopg2.connect(**self.db_config)
+            # Sized for the browser worker threads plus the coordinating thread
+            self.db_pool = ConnectionPool(
+                kwargs=self.db_config,
+                min_size=1,
+                max_size=max(2, 2 * self.browser_workers),
+                open=True
+            )
+            self.db_pool.wait(timeout=30)
             logger.info("✅ Connected to database")
             return True
-        except Exception as e:
-            logger.error(f"❌ Database connection failed: {e}")
+        except (PoolTimeout, psycopg.Error) as e:
+            logger.error("❌ Database connection failed: %s", e)
+            if self.db_pool:
+                self.db_pool.close()
+                self.db_pool = None
             return False
     
     def setup_driver(self):
         """Setup Chrome driver with anti-detection"""
         try:
-            # Chrome options with better stealth
-            options = uc.ChromeOptions()
-            
-            if self.headless:
-                options.add_argument('--headless=new')
-                
-            # Enhanced stealth arguments
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-extensions')
-            options.add_argument('--no-first-run')
-            options.add_argument('--disable-default-apps')
-            options.add_argument('--disable-infobars')
-            options.add_argument('--disable-features=VizDisplayCompositor')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--disable-web-security')
-            options.add_argument('--disable-features=ChromeWhatsNewUI')
-            options.add_argument('--disable-background-timer-throttling')
-            options.add_argument('--disable-backgrounding-occluded-windows')
-            options.add_argument('--disable-renderer-backgrounding')
-            options.add_argument('--disable-field-trial-config')
-            options.add_argument('--disable-back-forward-cache')
-            options.add_argument('--disable-ipc-flooding-protection')
-            
-            # User agent - use a realistic Windows Chrome agent
-            user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            options.add_argument(f'--user-agent={user_agent}')
-            
-            # Create driver with better stealth
-            self.driver = uc.Chrome(options=options, version_main=None, driver_executable_path=None)
-            
-            # Set timeouts
-            self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
-            
-            # Additional stealth JavaScript
-            stealth_js = """
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['es-PE', 'es', 'en-US', 'en']});
-                window.chrome = {runtime: {}};
-                
-                // Override permissions
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({ state: Notification.permission }) :
-                        originalQuery(parameters)
-                );
-            """
-            self.driver.execute_script(stealth_js)
-            
+            self.driver = self.create_driver()
             logger.info("✅ Chrome driver initialized with enhanced stealth mode")
             return True
             
         except Exception as e:
-            logger.error(f"❌ Driver setup failed: {e}")
+            logger.error("❌ Driver setup failed: %s", e)
             return False
     
+    def create_driver(self):
+        """Create a Chrome driver with anti-detection (raises on failure)"""
+        options = self.chrome_options()
+        
+        # Create driver with better stealth, reusing a pinned chromedriver when available
+        version_main = _chrome_major_version()
+        driver_path = _chromedriver_path(version_main)
+        try:
+            driver = uc.Chrome(options=options, version_main=version_main, driver_executable_path=driver_path)
+        except SessionNotCreatedException as e:
+            if not driver_path:
+                raise
+            # Chrome was upgraded past the pinned/cached driver: drop the cached copy and patch a new one
+            logger.warning("⚠️ Chromedriver %s no longer matches Chrome, patching a new one: %s", driver_path, e.msg)
+            if driver_path == _cached_chromedriver_path(version_main):
+                try:
+                    os.remove(driver_path)
+                except OSError:
+                    pass
+            _detect_chrome_major.cache_clear()
+            version_main = _chrome_major_version()
+            driver_path = None
+            driver = uc.Chrome(options=self.chrome_options(), version_main=version_main)
+        
+        if not driver_path:
+            self._cache_chromedriver(driver, version_main)
+        
+        # Set timeouts
+        driver.set_page_load_timeout(30)
+        # No implicit wait: every wait is an explicit WebDriverWait, so probing
+        # for an optional element (e.g. a CAPTCHA) fails fast instead of stalling 10 s
+        driver.implicitly_wait(0)
+        
+        # Additional stealth JavaScript
+        driver.execute_script(STEALTH_JS)
+        
+        # Prime the SUNAT session once per driver instead of before every RUC
+        driver.get(SUNAT_HOME_URL)
+        
+        return driver
+    
+    def chrome_options(self):
+        """Chrome options with better stealth (a fresh object; uc can't reuse options)"""
+        options = uc.ChromeOptions()
+        
+        if self.headless:
+            options.add_argument('--headless=new')
+            
+        # Enhanced stealth arguments
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--no-first-run')
+        options.add_argument('--disable-default-apps')
+        options.add_argument('--disable-infobars')
+        # One --disable-features switch: Chrome only keeps the last one given
+        options.add_argument('--disable-features=VizDisplayCompositor,ChromeWhatsNewUI,Translate')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument('--disable-web-security')
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-backgrounding-occluded-windows')
+        options.add_argument('--disable-renderer-backgrounding')
+        options.add_argument('--disable-field-trial-config')
+        options.add_argument('--disable-back-forward-cache')
+        options.add_argument('--disable-ipc-flooding-protection')
+        
+        # Nothing here needs a GPU, sync, translation, Safe Browsing updates or audio
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-sync')
+        options.add_argument('--disable-translate')
+        options.add_argument('--safebrowsing-disable-auto-update')
+        options.add_argument('--mute-audio')
+        options.add_argument('--disable-background-networking')
+        
+        # driver.get returns at DOMContentLoaded; explicit waits cover the elements we need
+        options.page_load_strategy = 'eager'
+        
+        # Only the result text is needed: skip images, stylesheets and fonts
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2
+        })
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        
+        options.add_argument(f'--user-agent={CHROME_USER_AGENT}')
+        
+        return options
+    
+    def _cache_chromedriver(self, driver, version_main):
+        """Keep a copy of the freshly patched chromedriver for later launches"""
+        try:
+            cached = _cached_chromedriver_path(version_main)
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            # Copy then rename: other processes and pool threads launch from this path,
+            # so they must never see a half-written binary (one .partial per writer)
+            partial = f"{cached}.{os.getpid()}.{threading.get_ident()}.partial"
+            shutil.copy2(driver.patcher.executable_path, partial)
+            os.replace(partial, cached)
+            logger.info("📦 Cached chromedriver at %s", cached)
+        except Exception as e:
+            logger.warning("⚠️ Could not cache chromedriver: %s", e)
+    
     def solve_captcha(self, site_key, page_url):
-        """Solve reCAPTCHA using 2captcha service"""
+        """Solve reCAPTCHA using 2captcha service, reusing recent tokens per site_key"""
+        return self.finish_captcha(site_key, self.start_captcha(site_key, page_url))
+    
+    def _cached_captcha_token(self, site_key):
+        """Recent token for site_key, or None (caller holds captcha_lock)"""
+        cached = self.captcha_cache.get(site_key)
+        if cached and time.time() - cached[0] < CAPTCHA_TOKEN_TTL:
+            return cached[1]
+        return None
+    
+    def start_captcha(self, site_key, page_url):
+        """Submit a reCAPTCHA to 2captcha without waiting; returns a Future of the captcha id (None if cached)"""
         if not self.solver:
             logger.warning("⚠️ No CAPTCHA solver configured")
             return None
+        
+        # Reserve the pending slot under the lock; the submission itself runs outside it
+        with self.captcha_lock:
+            if self._cached_captcha_token(site_key):
+                return None
+            
+            # Concurrent callers share the solve already in flight
+            if site_key in self.captcha_pending:
+                return self.captcha_pending[site_key]
             
+            pending = Future()
+            self.captcha_pending[site_key] = pending
+        
         try:
-            logger.info("🔐 Solving CAPTCHA...")
-            result = self.solver.recaptcha(
-                sitekey=site_key,
+            logger.info("🔐 Sending CAPTCHA to solver...")
+            pending.set_result(self.solver.send(
+                method='userrecaptcha',
+                googlekey=site_key,
                 url=page_url,
                 version='v3',
                 action='submit',
                 min_score=0.3
-            )
+            ))
+        except Exception as e:
+            logger.error("❌ CAPTCHA submission failed: %s", e)
+            pending.set_result(None)
+            with self.captcha_lock:
+                if self.captcha_pending.get(site_key) is pending:
+                    del self.captcha_pending[site_key]
+        return pending
+    
+    def finish_captcha(self, site_key, pending):
+        """Wait for the token of a started solve, or return a recent cached one"""
+        with self.captcha_lock:
+            token = self._cached_captcha_token(site_key)
+        if token:
+            logger.info("♻️ Reusing cached CAPTCHA token")
+            return token
+        
+        # Blocks only while another thread's submission is still on its way to 2captcha
+        captcha_id = pending.result() if pending else None
+        if not captcha_id:
+            return None
+        
+        try:
+            token = self.solver.wait_result(captcha_id, self.solver.recaptcha_timeout, self.solver.polling_interval)
             logger.info("✅ CAPTCHA solved")
-            return result['code']
+            with self.captcha_lock:
+                self.captcha_cache[site_key] = (time.time(), token)
+            return token
         except Exception as e:
-            logger.error(f"❌ CAPTCHA solving failed: {e}")
+            logger.error("❌ CAPTCHA solving failed: %s", e)
             return None
+        finally:
+            with self.captcha_lock:
+                if self.captcha_pending.get(site_key) is pending:
+                    del self.captcha_pending[site_key]
     
     def solve_image_captcha(self, captcha_image_url):
         """Solve image captcha using 2captcha service"""
@@ -168,121 +846,239 @@ class SUNATScraper:
             logger.info("✅ Image CAPTCHA solved")
             return result['code']
         except Exception as e:
-            logger.error(f"❌ Image CAPTCHA solving failed: {e}")
+            logger.error("❌ Image CAPTCHA solving failed: %s", e)
             return None
     
     def get_rucs_to_scrape(self, limit=None):
         """Get RUCs that need company names"""
         try:
-            cursor = self.db_connection.cursor()
-            
+            # ACTIVO first, then the rest: each branch is an ordered scan of its own
+            # partial index (idx_active_pending / idx_inactive_pending), so nothing is sorted
+            # LIMIT NULL (no limit given) means no limit in PostgreSQL.
+            # Known-invalid RUCs are skipped with a primary key probe per row
             query = """
-                SELECT ruc FROM sunat_empresas 
-                WHERE razon_social IS NULL 
-                ORDER BY CASE WHEN estado = 'ACTIVO' THEN 1 ELSE 2 END,
-                         id
+                (SELECT ruc FROM sunat_empresas e
+                 WHERE razon_social IS NULL AND estado = 'ACTIVO'
+                   AND NOT EXISTS (SELECT 1 FROM invalid_rucs i WHERE i.ruc = btrim(e.ruc))
+                 ORDER BY id LIMIT %(limit)s)
+                UNION ALL
+                (SELECT ruc FROM sunat_empresas e
+                 WHERE razon_social IS NULL AND estado IS DISTINCT FROM 'ACTIVO'
+                   AND NOT EXISTS (SELECT 1 FROM invalid_rucs i WHERE i.ruc = btrim(e.ruc))
+                 ORDER BY id LIMIT %(limit)s)
+                LIMIT %(limit)s
             """
             
-            if limit:
-                query += f" LIMIT {limit}"
-                
-            cursor.execute(query)
-            rucs = [row[0] for row in cursor.fetchall()]
-            cursor.close()
+            with self.db_pool.connection() as conn:
+                # Server-side cursor streams rows in chunks instead of materializing the result
+                with conn.cursor(name='rucs_cursor') as cursor:
+                    cursor.itersize = 1000
+                    cursor.execute(query, {'limit': limit or None})
+                    # Deduplicate while keeping priority order
+                    candidates = list(dict.fromkeys(row[0].strip() for row in cursor))
             
-            logger.info(f"📋 Found {len(rucs)} RUCs to scrape")
+            rucs = [ruc for ruc in candidates if _valid_ruc(ruc)]
+            invalid = [ruc for ruc in candidates if not _valid_ruc(ruc)]
+            if invalid:
+                logger.warning("⚠️ Skipping %d RUCs with invalid check digit", len(invalid))
+                self.mark_invalid_rucs(invalid)
+            
+            if self.attempted:
+                try:
+                    fresh = self.attempted.filter_new(rucs)
+                    if len(fresh) < len(rucs):
+                        logger.info("♻️ Skipping %d RUCs attempted in the last 24h", len(rucs) - len(fresh))
+                    rucs = fresh
+                except redis.RedisError as e:
+                    logger.warning("⚠️ Attempted-RUC cache unavailable: %s", e)
+            
+            logger.info("📋 Found %d RUCs to scrape", len(rucs))
             return rucs
             
         except Exception as e:
-            logger.error(f"❌ Error getting RUCs: {e}")
+            logger.error("❌ Error getting RUCs: %s", e)
             return []
     
-    def scrape_company_name(self, ruc):
-        """Scrape company name for a specific RUC"""
+    def mark_invalid_rucs(self, rucs):
+        """Record malformed RUCs in invalid_rucs (created by setup_optimized_database) so they are not queried again"""
+        try:
+            # The pooled connection commits on exit and rolls back on error
+            with self.db_pool.connection() as conn:
+                conn.execute(
+                    "INSERT INTO invalid_rucs (ruc) SELECT unnest(%s::text[]) ON CONFLICT (ruc) DO NOTHING",
+                    (rucs,)
+                )
+            return True
+            
+        except psycopg.Error as e:
+            logger.error("❌ Failed to mark invalid RUCs: %s", e)
+            return False
+    
+    def record_attempts(self, rucs):
+        """Remember RUCs with a definite outcome (a saved name or a real not-found) so a restarted run skips them"""
+        if not self.attempted or not rucs:
+            return
+        try:
+            self.attempted.add(rucs)
+        except redis.RedisError as e:
+            logger.debug("Could not record attempts for %d RUCs: %s", len(rucs), e)
+    
+    def lookup_cached_names(self, rucs):
+        """Names already known in the local ruc_cache table, keyed by RUC"""
+        try:
+            with self.db_pool.connection() as conn:
+                cursor = conn.execute(
+                    "SELECT ruc, razon_social FROM ruc_cache WHERE ruc = ANY(%s) AND razon_social <> ''",
+                    (rucs,)
+                )
+                return dict(cursor.fetchall())
+            
+        except psycopg.Error as e:
+            logger.warning("⚠️ Local RUC cache unavailable: %s", e)
+            return {}
+    
+    def resolve_via_apis(self, ruc):
+        """Try each configured REST API in turn; None when all of them miss"""
+        for resolver in self.api_resolvers:
+            try:
+                company_name = resolver.get(ruc)
+            except (requests.RequestException, ValueError) as e:
+                logger.debug("%s lookup failed for RUC %s: %s", resolver.name, ruc, e)
+                continue
+            if company_name:
+                logger.info("✅ Found via %s: %s", resolver.name, company_name)
+                return company_name
+        return None
+    
+    def resolve_without_scraping(self, rucs):
+        """Resolve RUCs from the local cache, then the REST APIs; returns (found, remaining)"""
+        found = self.lookup_cached_names(rucs)
+        if found:
+            logger.info("💾 %d RUCs resolved from the local cache", len(found))
+        
+        remaining = [ruc for ruc in rucs if ruc not in found]
+        if self.api_resolvers and remaining:
+            with ThreadPoolExecutor(max_workers=self.http_concurrency) as executor:
+                names = dict(zip(remaining, executor.map(self.resolve_via_apis, remaining)))
+            found.update((ruc, name) for ruc, name in names.items() if name)
+            remaining = [ruc for ruc in remaining if not names[ruc]]
+        
+        return found, remaining
+    
+    def scrape_company_name(self, ruc, use_http=True, driver=None):
+        """Scrape company name for a specific RUC, using the browser only when HTTP is challenged"""
+        if use_http:
+            company_name = self.resolve_via_apis(ruc)
+            if company_name:
+                return company_name
+        
+        if use_http and self.http_scraper:
+            try:
+                company_name = self.http_scraper.lookup(ruc)
+                if company_name:
+                    logger.info("✅ Found via HTTP: %s", company_name)
+                else:
+                    logger.warning("⚠️ No company name found for RUC %s", ruc)
+                    self.record_attempts([ruc])
+                return company_name
+            except CaptchaChallenge as e:
+                delay = _backoff_delay(self.http_scraper.captcha_streak - 1, e)
+                logger.info("🔐 CAPTCHA challenge for RUC %s, cooling down %.1fs before the browser", ruc, delay)
+                time.sleep(delay)
+            except (requests.RequestException, UnexpectedPage) as e:
+                logger.warning("⚠️ HTTP lookup failed for RUC %s, falling back to browser: %s", ruc, e)
+        
+        if driver is None:
+            if not self.driver and not self.setup_driver():
+                return None
+            driver = self.driver
+        
+        return self._scrape_with_browser(ruc, driver)
+    
+    def _scrape_with_browser(self, ruc, driver):
+        """Scrape company name for a specific RUC through the Selenium driver"""
         max_attempts = 3
+        not_found = False
         
         for attempt in range(max_attempts):
             try:
-                logger.info(f"🔍 Scraping RUC: {ruc} (attempt {attempt + 1})")
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
                 
-                # Navigate to SUNAT page with session setup
-                logger.info("🌐 Navigating to SUNAT website...")
-                self.driver.get("https://e-consultaruc.sunat.gob.pe/")
-                time.sleep(3)  # Allow initial redirect and session setup
+                logger.info("🔍 Scraping RUC: %s (attempt %d)", ruc, attempt + 1)
                 
-                # Follow redirect to search page
-                self.driver.get("https://e-consultaruc.sunat.gob.pe/cl-ti-itmrconsruc/FrameCriterioBusquedaWeb.jsp")
+                # Session was primed when the driver was created; go straight to the search page
+                driver.get(SUNAT_SEARCH_URL)
                 
                 # Wait for page to load
-                WebDriverWait(self.driver, 15).until(
+                WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((By.ID, "txtRuc"))
                 )
                 
-                # Wait a bit more for page to fully load
-                time.sleep(2)
+                # Start a reCAPTCHA solve now so it runs while the form is filled in
+                site_key = None
+                captcha_pending = None
+                if self.solver:
+                    site_keys = driver.find_elements(By.CSS_SELECTOR, "[data-sitekey]")
+                    site_key = site_keys[0].get_attribute("data-sitekey") if site_keys else None
+                    if site_key:
+                        logger.info("🔐 Found reCAPTCHA v3")
+                        captcha_pending = self.start_captcha(site_key, driver.current_url)
                 
                 # Select RUC search option (ensure it's clickable)
                 try:
-                    ruc_radio = WebDriverWait(self.driver, 10).until(
+                    ruc_radio = WebDriverWait(driver, 10).until(
                         EC.element_to_be_clickable((By.ID, "rbtnTipo01"))
                     )
-                    self.driver.execute_script("arguments[0].click();", ruc_radio)
+                    driver.execute_script("arguments[0].click();", ruc_radio)
                     logger.info("✅ Selected RUC search option")
                 except Exception as e:
-                    logger.warning(f"⚠️ Could not select RUC radio button: {e}")
+                    logger.warning("⚠️ Could not select RUC radio button: %s", e)
                     # Try alternative selector
                     try:
-                        ruc_radio = self.driver.find_element(By.NAME, "rbtnTipo")
-                        self.driver.execute_script("arguments[0].click();", ruc_radio)
+                        ruc_radio = driver.find_element(By.NAME, "rbtnTipo")
+                        driver.execute_script("arguments[0].click();", ruc_radio)
                     except:
                         logger.warning("⚠️ Alternative RUC radio button not found")
                 
                 # Wait for RUC input to be available
-                ruc_input = WebDriverWait(self.driver, 10).until(
+                ruc_input = WebDriverWait(driver, 10).until(
                     EC.element_to_be_clickable((By.ID, "txtRuc"))
                 )
                 
                 # Clear and enter RUC
                 ruc_input.clear()
                 ruc_input.send_keys(ruc)
-                logger.info(f"✅ Entered RUC: {ruc}")
-                
-                # Wait a moment
-                time.sleep(1)
+                logger.info("✅ Entered RUC: %s", ruc)
                 
                 # Handle different types of CAPTCHA
                 captcha_solved = False
                 
-                # Check for reCAPTCHA v3
-                try:
-                    recaptcha_element = self.driver.find_element(By.CSS_SELECTOR, "[data-sitekey]")
-                    site_key = recaptcha_element.get_attribute("data-sitekey")
-                    
-                    if site_key and self.solver:
-                        logger.info("🔐 Found reCAPTCHA v3")
-                        captcha_response = self.solve_captcha(site_key, self.driver.current_url)
+                # Collect the reCAPTCHA v3 token started above
+                if site_key:
+                    try:
+                        captcha_response = self.finish_captcha(site_key, captcha_pending)
                         if captcha_response:
                             # Inject CAPTCHA response
-                            self.driver.execute_script(f"document.getElementById('g-recaptcha-response').innerHTML='{captcha_response}';")
+                            driver.execute_script(f"document.getElementById('g-recaptcha-response').innerHTML='{captcha_response}';")
                             # Also try to set the token in the form
-                            self.driver.execute_script(f"if(typeof grecaptcha !== 'undefined') grecaptcha.execute();")
+                            driver.execute_script(f"if(typeof grecaptcha !== 'undefined') grecaptcha.execute();")
                             captcha_solved = True
                             logger.info("✅ reCAPTCHA v3 solved")
-                        
-                except Exception:
-                    logger.info("No reCAPTCHA v3 found")
+                    except Exception as e:
+                        logger.warning("⚠️ Could not inject reCAPTCHA token: %s", e)
                 
                 # Check for image CAPTCHA
                 if not captcha_solved:
                     try:
-                        captcha_img = self.driver.find_element(By.ID, "imgCaptcha")
+                        captcha_img = driver.find_element(By.ID, "imgCaptcha")
                         if captcha_img:
                             logger.info("🔐 Found image CAPTCHA")
                             captcha_src = captcha_img.get_attribute("src")
                             if captcha_src and self.solver:
                                 captcha_response = self.solve_image_captcha(captcha_src)
                                 if captcha_response:
-                                    captcha_input = self.driver.find_element(By.ID, "txtCodigo")
+                                    captcha_input = driver.find_element(By.ID, "txtCodigo")
                                     captcha_input.clear()
                                     captcha_input.send_keys(captcha_response)
                                     captcha_solved = True
@@ -292,73 +1088,77 @@ class SUNATScraper:
                 
                 # Find and click submit button
                 try:
-                    submit_button = WebDriverWait(self.driver, 10).until(
+                    submit_button = WebDriverWait(driver, 10).until(
                         EC.element_to_be_clickable((By.ID, "btnAceptar"))
                     )
-                    self.driver.execute_script("arguments[0].click();", submit_button)
+                    driver.execute_script("arguments[0].click();", submit_button)
                     logger.info("✅ Clicked submit button")
                 except Exception as e:
-                    logger.warning(f"⚠️ Could not click btnAceptar: {e}")
+                    logger.warning("⚠️ Could not click btnAceptar: %s", e)
                     # Try alternative submit methods
                     try:
-                        submit_button = self.driver.find_element(By.CSS_SELECTOR, "input[type='submit'], button[type='submit']")
-                        self.driver.execute_script("arguments[0].click();", submit_button)
+                        submit_button = driver.find_element(By.CSS_SELECTOR, SUBMIT_SELECTOR)
+                        driver.execute_script("arguments[0].click();", submit_button)
                     except:
                         # Try form submission
                         try:
-                            form = self.driver.find_element(By.ID, "form01")
-                            self.driver.execute_script("arguments[0].submit();", form)
+                            form = driver.find_element(By.ID, "form01")
+                            driver.execute_script("arguments[0].submit();", form)
                         except:
                             logger.error("❌ Could not submit form")
                             continue
                 
                 # Wait for results page with multiple conditions
                 try:
-                    WebDriverWait(self.driver, 20).until(
-                        lambda driver: (
-                            "FrameCriterioBusquedaWeb.jsp" not in driver.current_url or
-                            driver.find_elements(By.CSS_SELECTOR, "table") or
-                            driver.find_elements(By.CSS_SELECTOR, ".result") or
-                            "error" in driver.current_url.lower()
-                        )
-                    )
+                    WebDriverWait(driver, 20).until(_results_loaded)
                 except TimeoutException:
                     logger.warning("⚠️ Timeout waiting for results page")
                 
                 # Extract company name
-                company_name = self.extract_company_name()
+                company_name = self.extract_company_name(driver)
                 
                 if company_name:
-                    logger.info(f"✅ Found: {company_name}")
+                    logger.info("✅ Found: %s", company_name)
                     return company_name
                 else:
-                    logger.warning(f"⚠️ No company name found for RUC {ruc}")
-                    
-                # Random delay between requests
-                time.sleep(random.uniform(self.delay_min, self.delay_max))
+                    logger.warning("⚠️ No company name found for RUC %s", ruc)
+                    not_found = True
+                    # Don't hit SUNAT again straight away (nothing else paces this with SUNAT_RATE_LIMIT=0)
+                    if attempt < max_attempts - 1:
+                        time.sleep(max(1.0, _backoff_delay(attempt)))
                 
             except Exception as e:
-                logger.error(f"❌ Error scraping RUC {ruc}: {e}")
+                logger.error("❌ Error scraping RUC %s: %s", ruc, e)
                 if attempt == max_attempts - 1:
                     return None
-                time.sleep(random.uniform(2, 5))
+                time.sleep(_backoff_delay(attempt, e))
         
+        # Only a results page without a name counts as an attempt; errors are retried next run
+        if not_found:
+            self.record_attempts([ruc])
         return None
     
-    def extract_company_name(self):
+    def extract_company_name(self, driver):
         """Extract company name from result page"""
         try:
-            # Wait a bit for page to load
-            time.sleep(2)
+            # Fast path: read the field in the browser, ~100 bytes over the wire
+            company_name = self._extract_in_browser(driver)
+            if company_name:
+                return company_name
+            
+            # Fall back to one page_source transfer parsed locally with lxml
+            page_source = driver.page_source
             
             # Check if we're on an error page
-            page_text = self.driver.page_source.lower()
-            if any(error in page_text for error in ["no se encontró", "no existe", "error", "no encontrado"]):
+            if ERROR_PAGE_RE.search(page_source):
                 logger.warning("⚠️ Error page detected - RUC not found")
                 return None
                 
-            # Log current URL for debugging
-            logger.info(f"📍 Current URL: {self.driver.current_url}")
+            # Log current URL for debugging (skip the driver round-trip when disabled)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📍 Current URL: %s", driver.current_url)
+            
+            tree = lxml.html.fromstring(page_source)
             
             # Multiple strategies to find company name
             strategies = [
@@ -370,122 +1170,106 @@ class SUNATScraper:
             
             for strategy in strategies:
                 try:
-                    result = strategy()
+                    result = strategy(tree)
                     if result:
-                        logger.info(f"✅ Found company name using {strategy.__name__}: {result}")
+                        logger.info("✅ Found company name using %s: %s", strategy.__name__, result)
                         return result
                 except Exception as e:
-                    logger.debug(f"Strategy {strategy.__name__} failed: {e}")
+                    logger.debug("Strategy %s failed: %s", strategy.__name__, e)
                     continue
             
             logger.warning("⚠️ No company name found with any strategy")
             return None
             
         except Exception as e:
-            logger.error(f"❌ Error extracting company name: {e}")
+            logger.error("❌ Error extracting company name: %s", e)
             return None
     
-    def _extract_by_table_structure(self):
+    def _extract_in_browser(self, driver):
+        """Extract company name with one round-trip that returns a plain string"""
+        try:
+            if hasattr(driver, 'execute_cdp_cmd'):
+                result = driver.execute_cdp_cmd('Runtime.evaluate', {
+                    'expression': RAZON_SOCIAL_JS,
+                    'returnByValue': True
+                })
+                value = result.get('result', {}).get('value')
+            else:
+                # Remote sessions (e.g. a reused browser) have no CDP endpoint; strip the
+                # leading newline or ASI turns "return" into "return;"
+                value = driver.execute_script("return " + RAZON_SOCIAL_JS.strip())
+            if value and len(value) > 3:
+                return value
+        except Exception as e:
+            logger.debug("In-browser extraction failed: %s", e)
+        
+        return None
+    
+    def _extract_by_table_structure(self, tree):
         """Extract company name from table structure"""
-        # Look for table with company information
-        tables = self.driver.find_elements(By.TAG_NAME, "table")
-        
-        for table in tables:
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, "td")
-                if len(cells) >= 2:
-                    label_cell = cells[0].text.strip().lower()
-                    value_cell = cells[1].text.strip()
-                    
-                    # Check if this row contains company name
-                    if any(keyword in label_cell for keyword in [
-                        "razón social", "razon social", "nombre", "denominación",
-                        "company name", "business name"
-                    ]):
-                        if value_cell and len(value_cell) > 3:
-                            return value_cell
+        # Label cell followed by its value cell
+        for cell in RAZON_SOCIAL_XPATH(tree):
+            value = _node_text(cell)
+            if value and len(value) > 3:
+                return value
+        
+        for row in TABLE_ROW_XPATH(tree):
+            cells = row.findall('td')
+            label_cell = _node_text(cells[0])
+            value_cell = _node_text(cells[1])
+            
+            # Check if this row contains company name
+            if TABLE_LABEL_RE.search(label_cell) and len(value_cell) > 3:
+                return value_cell
         
         return None
     
-    def _extract_by_label_text(self):
+    def _extract_by_label_text(self, tree):
         """Extract company name by finding label text"""
-        # Use JavaScript to find elements by text content
-        elements = self.driver.execute_script("""
-            return Array.from(document.querySelectorAll('td, th, span, div, label')).filter(el => {
-                const text = el.textContent.toLowerCase();
-                return text.includes('razón social') || 
-                       text.includes('razon social') ||
-                       text.includes('nombre') ||
-                       text.includes('denominación');
-            });
-        """)
-        
-        for element in elements:
+        for element in tree.iter('td', 'th', 'span', 'div', 'label'):
+            if not LABEL_TEXT_RE.search(element.text_content()):
+                continue
+            
             # Try to find the next sibling or parent that might contain the name
-            next_sibling = self.driver.execute_script("return arguments[0].nextElementSibling;", element)
-            if next_sibling:
-                name = next_sibling.text.strip()
-                if name and len(name) > 3 and not name.lower().startswith('razón'):
+            next_sibling = element.getnext()
+            if next_sibling is not None:
+                name = _node_text(next_sibling)
+                if name and len(name) > 3 and not LABEL_PREFIX_RE.match(name):
                     return name
             
             # Try parent's next sibling
-            parent = self.driver.execute_script("return arguments[0].parentElement;", element)
-            if parent:
-                next_sibling = self.driver.execute_script("return arguments[0].nextElementSibling;", parent)
-                if next_sibling:
-                    name = next_sibling.text.strip()
-                    if name and len(name) > 3 and not name.lower().startswith('razón'):
+            parent = element.getparent()
+            if parent is not None:
+                next_sibling = parent.getnext()
+                if next_sibling is not None:
+                    name = _node_text(next_sibling)
+                    if name and len(name) > 3 and not LABEL_PREFIX_RE.match(name):
                         return name
         
         return None
     
-    def _extract_by_css_patterns(self):
-        """Extract company name using CSS patterns"""
-        # Common CSS selectors for company information
-        selectors = [
-            "[class*='razon']",
-            "[class*='nombre']",
-            "[class*='company']",
-            "[class*='business']",
-            "[id*='razon']",
-            "[id*='nombre']",
-            ".content td:nth-child(2)",
-            ".result td:nth-child(2)",
-            "table.data td:nth-child(2)"
-        ]
-        
-        for selector in selectors:
-            try:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    if text and len(text) > 5 and not text.isdigit():
-                        # Additional validation
-                        if not any(skip in text.lower() for skip in ['ruc', 'documento', 'número', 'codigo']):
-                            return text
-            except Exception:
-                continue
+    def _extract_by_css_patterns(self, tree):
+        """Extract company name using class/id patterns"""
+        for xpath in NAME_PATTERN_XPATHS:
+            for element in xpath(tree):
+                text = _node_text(element)
+                if text and len(text) > 5 and not text.isdigit():
+                    # Additional validation
+                    if not NAME_SKIP_RE.search(text):
+                        return text
         
         return None
     
-    def _extract_by_content_analysis(self):
+    def _extract_by_content_analysis(self, tree):
         """Extract company name by analyzing all content"""
-        # Get all text content from the page
-        all_tds = self.driver.find_elements(By.TAG_NAME, "td")
-        
         # Filter potential company names
         candidates = []
         
-        for td in all_tds:
-            text = td.text.strip()
+        for td in tree.iter('td'):
+            text = _node_text(td)
             if text and len(text) > 10:
                 # Skip if it's clearly not a company name
-                if any(skip in text.lower() for skip in [
-                    'ruc', 'documento', 'número', 'codigo', 'fecha', 'estado',
-                    'dirección', 'distrito', 'provincia', 'departamento',
-                    'teléfono', 'email', 'www', 'http'
-                ]):
+                if CONTENT_SKIP_RE.search(text):
                     continue
                 
                 # Skip if it's all numbers
@@ -509,54 +1293,113 @@ class SUNATScraper:
         
         return None
     
-    def update_database(self, ruc, company_name):
-        """Update database with scraped company name"""
+    def scrape_with_driver_pool(self, rucs):
+        """Scrape RUCs in the browser on a pool of drivers; returns how many had no name"""
+        workers = min(self.browser_workers, len(rucs))
+        logger.info("🚀 Starting %d pooled browsers", workers)
+        pool = ChromeDriverPool(self.create_driver, workers)
+        
+        failed = 0
         try:
-            cursor = self.db_connection.cursor()
-            
-            query = "UPDATE sunat_empresas SET razon_social = %s WHERE ruc = %s"
-            cursor.execute(query, (company_name, ruc))
-            self.db_connection.commit()
-            cursor.close()
-            
-            logger.info(f"✅ Updated database: {ruc} -> {company_name}")
-            return True
-            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._scrape_leased, pool, ruc): ruc for ruc in rucs}
+                
+                # Results are written from this thread only
+                for i, future in enumerate(as_completed(futures), 1):
+                    ruc = futures[future]
+                    company_name = future.result()
+                    if company_name:
+                        self.update_database(ruc, company_name)
+                    else:
+                        failed += 1
+                    
+                    if i % 10 == 0:
+                        logger.info("📈 Browser progress: %d/%d, %d found, %d failed",
+                                    i, len(rucs), i - failed, failed)
+        finally:
+            pool.close()
+        
+        return failed
+    
+    def _scrape_leased(self, pool, ruc):
+        """Worker task: scrape one RUC on a driver leased from the pool"""
+        try:
+            with pool.lease() as driver:
+                if driver is None:
+                    return None
+                return self.scrape_company_name(ruc, use_http=False, driver=driver)
         except Exception as e:
-            logger.error(f"❌ Database update failed: {e}")
-            return False
+            logger.error("❌ Error scraping RUC %s: %s", ruc, e)
+            return None
     
-    def run_batch_scraping(self, batch_size=None):
-        """Run batch scraping of companies"""
-        if not batch_size:
-            batch_size = self.batch_size
+    def update_database(self, ruc, company_name):
+        """Queue a scraped company name; rows are written (and counted) in batches"""
+        self.pending.append((ruc, company_name))
+        logger.info("✅ Queued database update: %s -> %s", ruc, company_name)
+        
+        if len(self.pending) >= UPDATE_BATCH_SIZE:
+            self.flush_updates()
+    
+    def flush_updates(self):
+        """Write all queued company names in one pipelined round-trip and one commit (kept queued on failure)"""
+        if not self.pending or not self.db_pool:
+            return True
             
         try:
-            # Setup
-            if not self.setup_database():
-                return False
-                
-            if not self.setup_driver():
-                return False
+            with self.db_pool.connection() as conn, conn.pipeline(), conn.cursor() as cursor:
+                cursor.executemany(
+                    "UPDATE sunat_empresas SET razon_social = %(name)s WHERE ruc = %(ruc)s",
+                    [{'ruc': ruc, 'name': name} for ruc, name in self.pending]
+                )
             
-            # Get RUCs to scrape
-            rucs = self.get_rucs_to_scrape(batch_size)
+            logger.info("✅ Updated database: %d rows", len(self.pending))
+            self.rows_written += len(self.pending)
+            # Committed: only now is it safe to let a restarted run skip these RUCs
+            self.record_attempts([ruc for ruc, _ in self.pending])
+            self.pending = []
+            return True
             
-            if not rucs:
-                logger.info("✅ No RUCs to scrape")
-                return True
+        except psycopg.Error as e:
+            logger.error("❌ Database update failed: %s", e)
+            return False
+    
+    def scrape_rucs(self, rucs):
+        """Resolve a list of RUCs through every tier and store the names; returns (successful, failed)"""
+        written = self.rows_written
+        failed = 0
+        
+        # Cheapest tiers first: local cache, then REST APIs
+        found, rucs = self.resolve_without_scraping(rucs)
+        for ruc, company_name in found.items():
+            self.update_database(ruc, company_name)
+        
+        # Resolve concurrently over HTTP; only challenged/failed RUCs go to the browser
+        if self.use_http:
+            found, rucs = asyncio.run(AsyncHttpSUNATScraper(self.http_concurrency, rate_limiter=self.rate_limiter).run(rucs))
+            # Names are recorded once flush_updates has saved them
+            self.record_attempts([ruc for ruc, company_name in found.items() if not company_name])
+            for ruc, company_name in found.items():
+                if company_name:
+                    self.update_database(ruc, company_name)
+                else:
+                    failed += 1
             
-            # Process each RUC
-            successful = 0
-            failed = 0
+            logger.info("⚡ HTTP phase: %d found, %d failed, %d left for browser",
+                        len(found) - failed, failed, len(rucs))
+        
+        # Several pooled browsers share the remaining RUCs
+        if self.browser_workers > 1 and rucs:
+            failed += self.scrape_with_driver_pool(rucs)
+        else:
+            # Process each remaining RUC in the browser
             driver_restarts = 0
             max_driver_restarts = 3
             
             for i, ruc in enumerate(rucs, 1):
-                logger.info(f"📊 Progress: {i}/{len(rucs)} ({(i/len(rucs)*100):.1f}%)")
+                logger.info("📊 Progress: %d/%d (%.1f%%)", i, len(rucs), i / len(rucs) * 100)
                 
                 # Restart driver if it's been used too much
-                if i > 1 and i % 50 == 0:
+                if self.driver and i > 1 and i % 50 == 0:
                     logger.info("🔄 Restarting driver after 50 requests")
                     try:
                         self.driver.quit()
@@ -565,24 +1408,22 @@ class SUNATScraper:
                             logger.error("❌ Failed to restart driver")
                             break
                     except Exception as e:
-                        logger.error(f"❌ Driver restart failed: {e}")
+                        logger.error("❌ Driver restart failed: %s", e)
                         break
                 
-                company_name = self.scrape_company_name(ruc)
+                company_name = self.scrape_company_name(ruc, use_http=False)
                 
                 if company_name:
-                    if self.update_database(ruc, company_name):
-                        successful += 1
-                    else:
-                        failed += 1
+                    self.update_database(ruc, company_name)
                 else:
                     failed += 1
                     
-                    # Check if driver is still responsive
+                # Check if driver is still responsive
+                if not company_name and self.driver:
                     try:
                         self.driver.current_url
                     except (WebDriverException, Exception) as e:
-                        logger.warning(f"⚠️ Driver seems unresponsive: {e}")
+                        logger.warning("⚠️ Driver seems unresponsive: %s", e)
                         if driver_restarts < max_driver_restarts:
                             logger.info("🔄 Attempting to restart driver")
                             try:
@@ -595,7 +1436,7 @@ class SUNATScraper:
                                     logger.error("❌ Failed to restart driver")
                                     break
                             except Exception as restart_error:
-                                logger.error(f"❌ Driver restart failed: {restart_error}")
+                                logger.error("❌ Driver restart failed: %s", restart_error)
                                 break
                         else:
                             logger.error("❌ Max driver restarts reached")
@@ -603,19 +1444,97 @@ class SUNATScraper:
                 
                 # Progress logging
                 if i % 10 == 0:
-                    logger.info(f"📈 Batch progress: {successful} successful, {failed} failed")
+                    logger.info("📈 Batch progress: %d found, %d failed", i - failed, failed)
                     
                 # Longer delay every 20 requests to avoid being blocked
                 if i % 20 == 0:
                     delay = random.uniform(10, 20)
-                    logger.info(f"😴 Taking longer break: {delay:.1f} seconds")
+                    logger.info("😴 Taking longer break: %.1f seconds", delay)
                     time.sleep(delay)
+        
+        # Only committed rows are successful; names a failed final flush left queued are not
+        self.flush_updates()
+        failed += len(self.pending)
+        return self.rows_written - written, failed
+    
+    def run_batch_scraping(self, batch_size=None):
+        """Run batch scraping of companies"""
+        if not batch_size:
+            batch_size = self.batch_size
+            
+        try:
+            # Setup
+            if not self.setup_database():
+                return False
+            
+            # Get RUCs to scrape
+            rucs = self.get_rucs_to_scrape(batch_size)
+            
+            if not rucs:
+                logger.info("✅ No RUCs to scrape")
+                return True
             
-            logger.info(f"🎉 Batch completed: {successful} successful, {failed} failed")
+            successful, failed = self.scrape_rucs(rucs)
+            
+            if self.pending:
+                logger.error("❌ Batch incomplete: %d company names could not be saved (%d successful, %d failed)",
+                             len(self.pending), successful, failed)
+                return False
+            
+            logger.info("🎉 Batch completed: %d successful, %d failed", successful, failed)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Batch scraping failed: {e}")
+            logger.error("❌ Batch scraping failed: %s", e)
+            return False
+            
+        finally:
+            self.cleanup()
+    
+    def run_parallel_scraping(self, batch_size=None, processes=None):
+        """Split the batch into shards and scrape each one in its own process"""
+        if not batch_size:
+            batch_size = self.batch_size
+        if not processes:
+            processes = self.processes
+            
+        try:
+            if not self.setup_database():
+                return False
+            
+            rucs = self.get_rucs_to_scrape(batch_size)
+            
+            if not rucs:
+                logger.info("✅ No RUCs to scrape")
+                return True
+            
+            # Strided shards keep ACTIVO RUCs spread evenly across processes
+            processes = min(processes, len(rucs))
+            shards = [rucs[i::processes] for i in range(processes)]
+            logger.info("🚀 Starting %d worker processes", processes)
+            
+            successful = 0
+            failed = 0
+            saved = True
+            
+            # Spawn (not fork) so workers don't inherit the DB socket or log listener thread
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                for shard_successful, shard_failed, shard_saved in executor.map(scrape_shard, shards):
+                    successful += shard_successful
+                    failed += shard_failed
+                    saved = saved and shard_saved
+            
+            if not saved:
+                logger.error("❌ Batch incomplete: some shards could not save their company names (%d successful, %d failed)",
+                             successful, failed)
+                return False
+            
+            logger.info("🎉 Batch completed: %d successful, %d failed", successful, failed)
+            return True
+            
+        except Exception as e:
+            logger.error("❌ Parallel scraping failed: %s", e)
             return False
             
         finally:
@@ -625,10 +1544,24 @@ class SUNATScraper:
         """Cleanup resources"""
         if self.driver:
             self.driver.quit()
-        if self.db_connection:
-            self.db_connection.close()
+        if self.db_pool:
+            if not self.flush_updates():
+                logger.error("❌ %d company names were not saved", len(self.pending))
+            self.db_pool.close()
         logger.info("🧹 Cleanup completed")
 
+def scrape_shard(rucs):
+    """Worker process: scrape one shard with its own DB connection, HTTP session and driver"""
+    scraper = SUNATScraper()
+    try:
+        if not scraper.setup_database():
+            return 0, len(rucs), False
+        successful, failed = scraper.scrape_rucs(rucs)
+        # Third value: whether every found name was saved
+        return successful, failed, not scraper.pending
+    finally:
+        scraper.cleanup()
+
 def main():
     """Main function"""
     logger.info("🚀 Starting SUNAT scraper")
@@ -644,7 +1577,10 @@ def main():
             logger.error("❌ Invalid batch size argument")
             sys.exit(1)
     
-    success = scraper.run_batch_scraping(batch_size)
+    if scraper.processes > 1:
+        success = scraper.run_parallel_scraping(batch_size)
+    else:
+        success = scraper.run_batch_scraping(batch_size)
     
     if success:
         logger.info("✅ Scraping completed successfully")
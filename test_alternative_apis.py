@@ -6,6 +6,13 @@ Test alternative RUC APIs to find the best performing one
 import requests
 import time
 import json
+from requests.adapters import HTTPAdapter
+
+# Shared keep-alive session so TCP/TLS handshakes are reused across probes
+SESSION = requests.Session()
+SESSION.headers['Connection'] = 'keep-alive'
+SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+SESSION.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
 
 def test_consulta_peru_api():
     """Test the consulta-peru open source API"""
@@ -25,7 +32,7 @@ def test_consulta_peru_api():
             url = f"{base_url}/ruc/{test_ruc}"
             print(f"   Trying: {url}")
             
-            response = requests.get(url, timeout=10)
+            response = SESSION.get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -61,7 +68,7 @@ def test_apis_net_pe():
     for url in endpoints:
         try:
             print(f"   Trying: {url}")
-            response = requests.get(url, timeout=10)
+            response = SESSION.get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -96,7 +103,7 @@ def test_other_public_apis():
     for url in endpoints:
         try:
             print(f"   Trying: {url}")
-            response = requests.get(url, timeout=10)
+            response = SESSION.get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
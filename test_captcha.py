@@ -11,6 +11,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from twocaptcha import TwoCaptcha
+from reusable_browser import open_browser, close_browser
 
 load_dotenv()
 
@@ -38,7 +39,7 @@ def test_captcha_detection():
     user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
     options.add_argument(f'--user-agent={user_agent}')
     
-    driver = uc.Chrome(options=options, version_main=None)
+    driver = open_browser(options)
     
     try:
         print("🌐 Navigating to SUNAT...")
@@ -106,7 +107,7 @@ def test_captcha_detection():
         return False
         
     finally:
-        driver.quit()
+        close_browser(driver)
     
     return captcha_found
 
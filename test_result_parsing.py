@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the SUNAT result page classification and the RUC check digit
+(no browser, network or database needed)
+
+    python test_result_parsing.py
+    python -m pytest test_result_parsing.py
+"""
+
+import os
+import sys
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sunat_scraper import _classify_result_page, _parse_company_name, _valid_ruc, CaptchaChallenge, UnexpectedPage
+
+RUC = "20100070970"
+
+# jcrS00Alias answer for a known RUC: "Número de RUC:" heading followed by "<ruc> - <name>"
+RESULT_PAGE = """
+<html><body>
+<div class="list-group">
+  <div class="list-group-item">
+    <h4 class="list-group-item-heading">Número de RUC:</h4>
+    <h4 class="list-group-item-heading">20100070970 - SUPERMERCADOS PERUANOS SOCIEDAD ANONIMA</h4>
+  </div>
+  <div class="list-group-item">
+    <h4 class="list-group-item-heading">Estado del Contribuyente:</h4>
+    <p class="list-group-item-text">ACTIVO</p>
+  </div>
+  <p>Condición de domicilio: no existe observación</p>
+</div>
+</body></html>
+"""
+
+NOT_FOUND_PAGE = """
+<html><body>
+<div class="panel panel-danger">
+  <div class="panel-body">No se encontró información para el número de RUC 20100070970</div>
+</div>
+</body></html>
+"""
+
+CAPTCHA_PAGE = """
+<html><body>
+<form id="form01" method="post" action="jcrS00Alias">
+  <input type="text" id="txtRuc" name="search1">
+  <div class="g-recaptcha" data-sitekey="6LdExampleSiteKey"></div>
+  <button id="btnAceptar" type="submit">Buscar</button>
+</form>
+</body></html>
+"""
+
+# Error pages, expired sessions and layout changes are not a "no match"
+ERROR_PAGE = """
+<html><body>
+<h1>Servicio no disponible</h1>
+<p>La aplicación ha retornado el siguiente problema. Inténtelo más tarde.</p>
+</body></html>
+"""
+
+def test_result_page_returns_name():
+    assert _parse_company_name(RESULT_PAGE) == "SUPERMERCADOS PERUANOS SOCIEDAD ANONIMA"
+    assert _classify_result_page(RESULT_PAGE, RUC) == "SUPERMERCADOS PERUANOS SOCIEDAD ANONIMA"
+
+def test_not_found_page_returns_none():
+    assert _classify_result_page(NOT_FOUND_PAGE, RUC) is None
+
+def test_captcha_page_raises_captcha_challenge():
+    try:
+        _classify_result_page(CAPTCHA_PAGE, RUC)
+    except CaptchaChallenge:
+        return
+    raise AssertionError("CAPTCHA page was not reported as a challenge")
+
+def test_error_page_raises_unexpected_page():
+    try:
+        _classify_result_page(ERROR_PAGE, RUC)
+    except UnexpectedPage:
+        return
+    raise AssertionError("error page was taken as a definite answer")
+
+def test_valid_rucs():
+    for ruc in ("20100070970", "20131312955", "20100047218"):
+        assert _valid_ruc(ruc), ruc
+
+def test_invalid_rucs():
+    # Wrong check digit, too short, too long, non-digit
+    for ruc in ("20100070971", "2010007097", "201000709701", "2010007097A", ""):
+        assert not _valid_ruc(ruc), ruc
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    sys.exit(1 if failed else 0)
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from sunat_scraper import SUNATScraper
+from reusable_browser import REUSE_BROWSER, open_browser
 
 # Load environment variables
 load_dotenv()
@@ -46,8 +47,10 @@ def test_scraper():
         logger.error("❌ Database setup failed - check your .env file")
         return False
     
-    # Test driver setup
-    if not scraper.setup_driver():
+    # Test driver setup (optionally re-attaching to the browser of a previous run)
+    if REUSE_BROWSER:
+        scraper.driver = open_browser(scraper.chrome_options())
+    elif not scraper.setup_driver():
         logger.error("❌ Driver setup failed")
         return False
     
@@ -74,7 +77,9 @@ def test_scraper():
             logger.error(f"❌ Error testing {ruc}: {e}")
             failed += 1
     
-    # Cleanup
+    # Cleanup (a reused browser stays open for the next run)
+    if REUSE_BROWSER:
+        scraper.driver = None
     scraper.cleanup()
     
     # Summary
@@ -8,6 +8,7 @@ import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from reusable_browser import open_browser, close_browser
 
 def test_sunat_access():
     print("🧪 Testing SUNAT website access...")
@@ -18,7 +19,7 @@ def test_sunat_access():
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     
-    driver = uc.Chrome(options=options, version_main=None)
+    driver = open_browser(options)
     
     try:
         print("📡 Navigating to SUNAT...")
@@ -70,7 +71,7 @@ def test_sunat_access():
         print(f"❌ Error: {e}")
         
     finally:
-        driver.quit()
+        close_browser(driver)
 
 if __name__ == "__main__":
     test_sunat_access()
\ No newline at end of file
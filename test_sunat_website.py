@@ -1,176 +1,469 @@
 #!/usr/bin/env python3
 """
 Test script to analyze current SUNAT website structure
+
+    python test_sunat_website.py               # analyze in Chrome and try a search
+    python test_sunat_website.py --use-cache   # static analysis from an HTTP cache (needs requests-cache)
+    python test_sunat_website.py --undetected  # use undetected_chromedriver instead of plain Selenium
 """
 
 import os
+import re
 import sys
-import time
+import json
+import atexit
+import shutil
+import socket
 import logging
+import argparse
+import subprocess
+import requests
+from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, JavascriptException, SessionNotCreatedException
 import undetected_chromedriver as uc
 
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def test_sunat_website():
-    """Test SUNAT website structure"""
+SEARCH_URL = "https://e-consultaruc.sunat.gob.pe/cl-ti-itmrconsruc/FrameCriterioBusquedaWeb.jsp"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# SQLite HTTP cache for --use-cache; the two pages rarely change
+HTTP_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'sunat_http_cache')
+HTTP_CACHE_EXPIRE = 3600
+
+# Resources the structure analysis never needs
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf",
+    "*google-analytics*", "*googletagmanager*"
+]
+
+# Page source markers, found case-insensitively in one pass without a lowercased copy.
+# recaptcha is tried before captcha so it is reported whole; it also counts as captcha.
+SOURCE_MARKERS = ('txtruc', 'btnaceptar', 'rbtntipo01', 'captcha', 'recaptcha')
+SOURCE_MARKER_RE = re.compile(
+    r"(?P<txtruc>txtRuc)|(?P<btnaceptar>btnAceptar)|(?P<rbtntipo01>rbtnTipo01)|"
+    r"(?P<recaptcha>recaptcha)|(?P<captcha>captcha)",
+    re.IGNORECASE
+)
+
+# Patched chromedriver kept between runs so uc doesn't download and patch it every launch
+CHROMEDRIVER_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'chromedriver_patched')
+
+# Installed Chrome major version, keyed by the binary's path and mtime (re-read after an upgrade)
+CHROME_VERSION_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'chrome_version.json')
+
+# Persistent Chrome profile, so its HTTP disk cache serves the SUNAT assets on later runs
+CHROME_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'chrome_profile')
+CHROME_DISK_CACHE_SIZE = 100 * 1024 * 1024
+
+# Presence of the search form elements, the fallback listings and the page source
+# markers, gathered in one call (the HTML is scanned in the browser, not transferred)
+PAGE_ANALYSIS_JS = """
+const out = {};
+for (const id of ['form01', 'rbtnTipo01', 'txtRuc', 'btnAceptar', 'imgCaptcha']) {
+    out[id] = !!document.getElementById(id);
+}
+const recaptcha = document.querySelector('[data-sitekey]');
+out.sitekey = recaptcha ? recaptcha.getAttribute('data-sitekey') : null;
+// DOM snapshot for the fallback listings, only for the elements that are missing
+const describe = (selector, fields) => Array.from(document.querySelectorAll(selector), (el) => {
+    const item = {};
+    for (const field of fields) item[field] = field === 'text' ? el.innerText : el[field];
+    return item;
+});
+out.forms = out.form01 ? null : describe('form', ['id', 'name']);
+out.radios = out.rbtnTipo01 ? null : describe("input[type='radio']", ['id', 'name']);
+out.texts = out.txtRuc ? null : describe("input[type='text']", ['id', 'name']);
+out.buttons = out.btnAceptar ? null : describe("input[type='submit'], button", ['id', 'type', 'text']);
+out.captchas = out.imgCaptcha ? null : describe("[id*='captcha'], [class*='captcha']", ['id']);
+const html = document.documentElement.outerHTML.toLowerCase();
+out.source = {};
+for (const marker of ['txtruc', 'btnaceptar', 'rbtntipo01', 'captcha', 'recaptcha']) {
+    out.source[marker] = html.includes(marker);
+}
+return out;
+"""
+
+# Select the RUC option and set txtRuc, firing the events the page listens for
+FILL_SEARCH_FORM_JS = """
+const radio = document.getElementById('rbtnTipo01');
+if (radio) {
+    radio.checked = true;
+    radio.dispatchEvent(new Event('change', {bubbles: true}));
+}
+const input = document.getElementById('txtRuc');
+if (input) {
+    input.value = arguments[0];
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return {radio: !!radio, input: !!input};
+"""
+
+def log_page_analysis(page):
+    """Log the search page findings (from PAGE_ANALYSIS_JS or the static analysis)"""
+    # Check for form
+    if page['form01']:
+        logger.info("✅ Found form with ID 'form01'")
+    else:
+        logger.warning("⚠️ Form 'form01' not found")
+        logger.info("Found %d forms on page", len(page['forms']))
+    
+    # Check for RUC radio button
+    if page['rbtnTipo01']:
+        logger.info("✅ Found RUC radio button")
+    else:
+        logger.warning("⚠️ RUC radio button not found")
+        logger.info("Found %d radio buttons", len(page['radios']))
+        for i, radio in enumerate(page['radios']):
+            logger.info("  Radio %d: ID=%s, Name=%s", i, radio['id'], radio['name'])
+    
+    # Check for RUC input
+    if page['txtRuc']:
+        logger.info("✅ Found RUC input field")
+    else:
+        logger.warning("⚠️ RUC input field not found")
+        logger.info("Found %d text inputs", len(page['texts']))
+        for i, inp in enumerate(page['texts']):
+            logger.info("  Input %d: ID=%s, Name=%s", i, inp['id'], inp['name'])
+    
+    # Check for submit button
+    if page['btnAceptar']:
+        logger.info("✅ Found submit button")
+    else:
+        logger.warning("⚠️ Submit button 'btnAceptar' not found")
+        logger.info("Found %d buttons", len(page['buttons']))
+        for i, btn in enumerate(page['buttons']):
+            logger.info("  Button %d: ID=%s, Type=%s, Text=%s", i, btn['id'], btn['type'], btn['text'])
+    
+    # Check for captcha
+    if page['imgCaptcha']:
+        logger.info("✅ Found captcha image")
+    else:
+        logger.warning("⚠️ Captcha image not found")
+        logger.info("Found %d captcha-related elements", len(page['captchas']))
+    
+    # Check for reCAPTCHA
+    if page['sitekey'] is not None:
+        logger.info("✅ Found reCAPTCHA with site key: %s", page['sitekey'])
+    else:
+        logger.warning("⚠️ reCAPTCHA not found")
+    
+    logger.info("📄 Page source analysis...")
+    source = page['source']
+    
+    # Check for specific elements in source
+    if source['txtruc']:
+        logger.info("✅ txtRuc found in page source")
+    if source['btnaceptar']:
+        logger.info("✅ btnAceptar found in page source")
+    if source['rbtntipo01']:
+        logger.info("✅ rbtnTipo01 found in page source")
+    if source['captcha']:
+        logger.info("✅ Captcha references found in page source")
+    if source['recaptcha']:
+        logger.info("✅ reCAPTCHA references found in page source")
+
+def _source_markers(html):
+    """Which SOURCE_MARKERS occur in the HTML"""
+    hits = {match.lastgroup for match in SOURCE_MARKER_RE.finditer(html)}
+    if 'recaptcha' in hits:
+        hits.add('captcha')
+    return {marker: marker in hits for marker in SOURCE_MARKERS}
+
+def static_page_analysis(html):
+    """Same findings as PAGE_ANALYSIS_JS, computed from raw HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    recaptcha = soup.select_one('[data-sitekey]')
+    
+    page = {element_id: soup.find(id=element_id) is not None
+            for element_id in ('form01', 'rbtnTipo01', 'txtRuc', 'btnAceptar', 'imgCaptcha')}
+    page.update({
+        'sitekey': recaptcha.get('data-sitekey') if recaptcha else None,
+        'forms': [{'id': el.get('id'), 'name': el.get('name')} for el in soup.find_all('form')],
+        'radios': [{'id': el.get('id'), 'name': el.get('name')} for el in soup.select("input[type='radio']")],
+        'texts': [{'id': el.get('id'), 'name': el.get('name')} for el in soup.select("input[type='text']")],
+        'buttons': [{'id': el.get('id'), 'type': el.get('type', 'submit'), 'text': el.get_text(strip=True)}
+                    for el in soup.select("input[type='submit'], button")],
+        'captchas': [{'id': el.get('id')} for el in soup.select("[id*='captcha'], [class*='captcha']")],
+        'source': _source_markers(html)
+    })
+    return page
+
+def analyze_cached_pages():
+    """Analyze the search page from the HTTP cache; None when Chrome is needed instead"""
+    if requests_cache is None:
+        logger.warning("⚠️ requests-cache is not installed, falling back to Selenium")
+        return None
+    
+    session = requests_cache.CachedSession(HTTP_CACHE_PATH, backend='sqlite', expire_after=HTTP_CACHE_EXPIRE)
+    session.headers['User-Agent'] = USER_AGENT
+    try:
+        search = session.get(SEARCH_URL, timeout=15)
+    except requests.RequestException as e:
+        logger.warning("⚠️ Cached fetch failed, falling back to Selenium: %s", e)
+        return None
+    
+    if search.status_code != 200 or 'form01' not in search.text:
+        logger.warning("⚠️ Search form not in fetched page, falling back to Selenium")
+        return None
+    
+    logger.info("Search page URL: %s (from cache: %s)", search.url, search.from_cache)
+    return static_page_analysis(search.text)
+
+def chrome_options(undetected=False):
+    """Headless-friendly options tuned for DOM inspection (a fresh object; uc can't reuse options)"""
+    options = uc.ChromeOptions() if undetected else webdriver.ChromeOptions()
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')  # virtual viewport when headless
+    options.add_argument('--disable-gpu')
+    options.add_argument('--mute-audio')
+    # Keep "HeadlessChrome" out of the user agent
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    # uc keeps a user-supplied profile instead of creating and deleting a temp one
+    options.add_argument(f"--user-data-dir={CHROME_PROFILE_DIR}")
+    options.add_argument('--profile-directory=Default')
+    options.add_argument(f"--disk-cache-size={CHROME_DISK_CACHE_SIZE}")
+    # Return at DOMContentLoaded; only the form DOM and page source are inspected
+    options.page_load_strategy = 'eager'
+    return options
+
+def _cache_chromedriver(driver):
+    """Keep a copy of the freshly patched chromedriver for later runs"""
+    try:
+        os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE), exist_ok=True)
+        # Copy then rename, so an interrupted copy never leaves a truncated binary in the cache
+        partial = f"{CHROMEDRIVER_CACHE}.partial"
+        shutil.copy2(driver.patcher.executable_path, partial)
+        os.replace(partial, CHROMEDRIVER_CACHE)
+        logger.info("📦 Cached patched chromedriver at %s", CHROMEDRIVER_CACHE)
+    except OSError as e:
+        logger.warning("⚠️ Could not cache chromedriver: %s", e)
+
+def _clear_stale_profile_lock():
+    """Remove the profile's SingletonLock left behind by a Chrome that crashed"""
+    lock = os.path.join(CHROME_PROFILE_DIR, 'SingletonLock')
+    try:
+        # A symlink to "<hostname>-<pid>" of the Chrome holding the profile
+        host, _, pid = os.readlink(lock).rpartition('-')
+    except OSError:
+        return
+    
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+            return  # owner still running
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            return
+    
+    try:
+        os.unlink(lock)
+        logger.info("🧹 Removed stale Chrome profile lock (pid %s)", pid)
+    except OSError as e:
+        logger.warning("⚠️ Could not remove Chrome profile lock: %s", e)
+
+def _detect_chrome_major():
+    """Major version of the installed Chrome (`chrome --version`), cached on disk"""
+    binary = uc.find_chrome_executable()
+    if not binary:
+        return None
+    
+    key = f"{binary}:{os.stat(binary).st_mtime_ns}"
+    try:
+        with open(CHROME_VERSION_CACHE) as f:
+            cached = json.load(f)
+        if cached['key'] == key:
+            return cached['major']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    try:
+        output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("⚠️ Could not read the Chrome version: %s", e)
+        return None
+    
+    match = re.search(r"(\d+)\.\d+", output)
+    if not match:
+        return None
+    
+    major = int(match.group(1))
+    try:
+        os.makedirs(os.path.dirname(CHROME_VERSION_CACHE), exist_ok=True)
+        with open(CHROME_VERSION_CACHE, 'w') as f:
+            json.dump({'key': key, 'major': major}, f)
+    except OSError as e:
+        logger.warning("⚠️ Could not cache the Chrome version: %s", e)
+    return major
+
+def chrome_major_version():
+    """CHROME_MAJOR if set, else the detected Chrome major version (None lets uc probe it)"""
+    version = os.getenv('CHROME_MAJOR')
+    return int(version) if version else _detect_chrome_major()
+
+def _create_undetected_driver():
+    """uc.Chrome, reusing the cached patched chromedriver when it still matches Chrome"""
+    # uc picks --headless=new (Chrome >= 108) or --headless=chrome for the installed version;
+    # passing version_main spares it looking up the matching chromedriver release itself
+    version_main = chrome_major_version()
     driver = None
+    if os.path.exists(CHROMEDRIVER_CACHE):
+        try:
+            driver = uc.Chrome(options=chrome_options(undetected=True), headless=True, version_main=version_main,
+                               use_subprocess=True, driver_executable_path=CHROMEDRIVER_CACHE)
+        except SessionNotCreatedException as e:
+            # Chrome was upgraded past the cached driver: patch a new one
+            logger.warning("⚠️ Cached chromedriver no longer matches Chrome: %s", e.msg)
+    
+    if driver is None:
+        driver = uc.Chrome(options=chrome_options(undetected=True), headless=True, version_main=version_main,
+                           use_subprocess=True)
+        _cache_chromedriver(driver)
+    return driver
+
+def create_driver(undetected=False):
+    """Headless Chrome: plain Selenium, or undetected_chromedriver when asked for"""
+    os.makedirs(CHROME_PROFILE_DIR, exist_ok=True)
+    _clear_stale_profile_lock()
+    
+    if undetected:
+        driver = _create_undetected_driver()
+    else:
+        # The probe only reads the DOM and never submits the form, so there is nothing
+        # to hide from bot detection; Selenium Manager supplies the stock chromedriver
+        options = chrome_options()
+        options.add_argument('--headless=new')
+        driver = webdriver.Chrome(options=options)
+    
+    driver.set_page_load_timeout(15)
+    
+    # Block static assets and trackers; the captcha image (captcha?accion=image) has no
+    # file extension, so it is never matched and imgCaptcha still loads
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    return driver
+
+# One browser shared by every probe in this process (launched on first use)
+_driver = None
+
+def get_driver(undetected=False):
+    """The shared driver, so further probes don't each pay for a Chrome launch"""
+    global _driver
+    if _driver is None:
+        _driver = create_driver(undetected)
+        atexit.register(close_driver)
+    return _driver
+
+def close_driver():
+    """Quit the shared driver, if it was started"""
+    global _driver
+    if _driver is not None:
+        _driver.quit()
+        _driver = None
+        logger.info("🧹 Browser closed")
+
+def _probe_search(undetected=False):
+    """Analyze the search page and try a search; returns the findings"""
+    driver = get_driver(undetected)
+    driver.get(SEARCH_URL)
     try:
-        # Setup Chrome driver
-        options = uc.ChromeOptions()
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--window-size=1920,1080')
-        
-        driver = uc.Chrome(options=options)
-        
-        # Navigate to SUNAT
-        logger.info("🌐 Navigating to SUNAT website...")
-        driver.get("https://e-consultaruc.sunat.gob.pe/")
-        time.sleep(3)
-        
-        logger.info(f"Current URL: {driver.current_url}")
-        logger.info(f"Page title: {driver.title}")
+        WebDriverWait(driver, 10).until(EC.any_of(
+            EC.presence_of_element_located((By.ID, "form01")),
+            EC.presence_of_element_located((By.TAG_NAME, "form"))
+        ))
+    except TimeoutException:
+        logger.warning("⚠️ Timeout waiting for search form, analyzing page anyway")
+    
+    findings = {'url': driver.current_url, 'title': driver.title}
+    
+    # All element probes in one round-trip
+    findings['page'] = driver.execute_script(PAGE_ANALYSIS_JS)
+    findings['search_ok'] = _try_search(driver)
+    return findings
+
+def _try_search(driver):
+    """Fill in the search form with an example RUC"""
+    logger.info("🧪 Testing search functionality...")
+    test_ruc = "20100070970"  # Example RUC
+    
+    try:
+        # Select the RUC option and type the RUC in a single round-trip
+        filled = driver.execute_script(FILL_SEARCH_FORM_JS, test_ruc)
+        if filled['radio']:
+            logger.info("✅ Selected RUC radio button")
+        else:
+            logger.warning("⚠️ Could not select RUC radio button")
+        if filled['input']:
+            logger.info("✅ Entered test RUC: %s", test_ruc)
+        else:
+            logger.warning("⚠️ Could not enter RUC")
+        return True
         
-        # Try to navigate to search page
-        logger.info("🔍 Trying to access search page...")
-        driver.get("https://e-consultaruc.sunat.gob.pe/cl-ti-itmrconsruc/FrameCriterioBusquedaWeb.jsp")
-        time.sleep(3)
+    except JavascriptException as e:
+        # A broken page script; a dead session (WebDriverException) propagates instead
+        logger.error("❌ Test search failed: %s", e.msg)
+        return False
+
+def test_sunat_website(use_cache=False, undetected=False):
+    """Test SUNAT website structure"""
+    if use_cache:
+        logger.info("💾 Analyzing cached SUNAT pages...")
+        page = analyze_cached_pages()
+        if page is not None:
+            log_page_analysis(page)
+            logger.info("⏭️ Search test needs a browser, skipped with --use-cache")
+            return True
+    
+    try:
+        # The search page sets its own session cookie; the homepage visit added nothing
+        logger.info("🔍 Navigating to SUNAT search page...")
+        search = _probe_search(undetected)
         
-        logger.info(f"Search page URL: {driver.current_url}")
-        logger.info(f"Search page title: {driver.title}")
+        logger.info("Search page URL: %s", search['url'])
+        logger.info("Search page title: %s", search['title'])
         
         # Analyze page structure
         logger.info("📋 Analyzing page structure...")
+        log_page_analysis(search['page'])
         
-        # Check for form
-        try:
-            form = driver.find_element(By.ID, "form01")
-            logger.info("✅ Found form with ID 'form01'")
-        except NoSuchElementException:
-            logger.warning("⚠️ Form 'form01' not found")
-            # Try to find any form
-            forms = driver.find_elements(By.TAG_NAME, "form")
-            logger.info(f"Found {len(forms)} forms on page")
-        
-        # Check for RUC radio button
-        try:
-            ruc_radio = driver.find_element(By.ID, "rbtnTipo01")
-            logger.info("✅ Found RUC radio button")
-        except NoSuchElementException:
-            logger.warning("⚠️ RUC radio button not found")
-            # Try to find any radio buttons
-            radios = driver.find_elements(By.CSS_SELECTOR, "input[type='radio']")
-            logger.info(f"Found {len(radios)} radio buttons")
-            for i, radio in enumerate(radios):
-                logger.info(f"  Radio {i}: ID={radio.get_attribute('id')}, Name={radio.get_attribute('name')}")
-        
-        # Check for RUC input
-        try:
-            ruc_input = driver.find_element(By.ID, "txtRuc")
-            logger.info("✅ Found RUC input field")
-        except NoSuchElementException:
-            logger.warning("⚠️ RUC input field not found")
-            # Try to find any text inputs
-            inputs = driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-            logger.info(f"Found {len(inputs)} text inputs")
-            for i, inp in enumerate(inputs):
-                logger.info(f"  Input {i}: ID={inp.get_attribute('id')}, Name={inp.get_attribute('name')}")
-        
-        # Check for submit button
-        try:
-            submit_btn = driver.find_element(By.ID, "btnAceptar")
-            logger.info("✅ Found submit button")
-        except NoSuchElementException:
-            logger.warning("⚠️ Submit button 'btnAceptar' not found")
-            # Try to find any submit buttons
-            buttons = driver.find_elements(By.CSS_SELECTOR, "input[type='submit'], button")
-            logger.info(f"Found {len(buttons)} buttons")
-            for i, btn in enumerate(buttons):
-                logger.info(f"  Button {i}: ID={btn.get_attribute('id')}, Type={btn.get_attribute('type')}, Text={btn.text}")
-        
-        # Check for captcha
-        try:
-            captcha_img = driver.find_element(By.ID, "imgCaptcha")
-            logger.info("✅ Found captcha image")
-        except NoSuchElementException:
-            logger.warning("⚠️ Captcha image not found")
-            # Try to find any captcha elements
-            captcha_elements = driver.find_elements(By.CSS_SELECTOR, "[id*='captcha'], [class*='captcha']")
-            logger.info(f"Found {len(captcha_elements)} captcha-related elements")
-        
-        # Check for reCAPTCHA
-        try:
-            recaptcha = driver.find_element(By.CSS_SELECTOR, "[data-sitekey]")
-            site_key = recaptcha.get_attribute("data-sitekey")
-            logger.info(f"✅ Found reCAPTCHA with site key: {site_key}")
-        except NoSuchElementException:
-            logger.warning("⚠️ reCAPTCHA not found")
-        
-        # Get page source snippet
-        logger.info("📄 Page source analysis...")
-        page_source = driver.page_source
-        
-        # Check for specific elements in source
-        if "txtRuc" in page_source:
-            logger.info("✅ txtRuc found in page source")
-        if "btnAceptar" in page_source:
-            logger.info("✅ btnAceptar found in page source")
-        if "rbtnTipo01" in page_source:
-            logger.info("✅ rbtnTipo01 found in page source")
-        if "captcha" in page_source.lower():
-            logger.info("✅ Captcha references found in page source")
-        if "recaptcha" in page_source.lower():
-            logger.info("✅ reCAPTCHA references found in page source")
-        
-        # Try a simple test search
-        logger.info("🧪 Testing search functionality...")
-        test_ruc = "20100070970"  # Example RUC
-        
-        try:
-            # Click RUC radio if found
-            try:
-                ruc_radio = driver.find_element(By.ID, "rbtnTipo01")
-                driver.execute_script("arguments[0].click();", ruc_radio)
-                logger.info("✅ Clicked RUC radio button")
-            except:
-                logger.warning("⚠️ Could not click RUC radio button")
-            
-            # Enter RUC if input found
-            try:
-                ruc_input = driver.find_element(By.ID, "txtRuc")
-                ruc_input.clear()
-                ruc_input.send_keys(test_ruc)
-                logger.info(f"✅ Entered test RUC: {test_ruc}")
-            except:
-                logger.warning("⚠️ Could not enter RUC")
-            
-            time.sleep(2)
+        if search['search_ok']:
             logger.info("✅ Test completed successfully")
-            
-        except Exception as e:
-            logger.error(f"❌ Test search failed: {e}")
         
         return True
         
     except Exception as e:
-        logger.error(f"❌ Website test failed: {e}")
+        logger.error("❌ Website test failed: %s", e)
         return False
-        
-    finally:
-        if driver:
-            driver.quit()
-            logger.info("🧹 Browser closed")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze the SUNAT search page structure")
+    parser.add_argument('--use-cache', action='store_true',
+                        help="analyze cached HTML without launching Chrome (skips the search test)")
+    parser.add_argument('--undetected', action='store_true',
+                        help="launch Chrome through undetected_chromedriver instead of plain Selenium")
+    args = parser.parse_args()
+    
     logger.info("🚀 Starting SUNAT website test")
-    success = test_sunat_website()
+    try:
+        success = test_sunat_website(use_cache=args.use_cache, undetected=args.undetected)
+    finally:
+        close_driver()
     
     if success:
         logger.info("✅ Website test completed")